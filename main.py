@@ -58,6 +58,7 @@ from main_window import Ui_kalah_window
 from options_dialog import Ui_kalah_options
 
 import state as st
+from methods.analysis import Analysis, line_to_string
 
 import sys
 import inspect
@@ -66,6 +67,7 @@ import os
 from os.path import isfile, join
 from importlib import import_module
 from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
 from PyQt5 import QtCore, QtGui, QtWidgets
 
 os.chdir(os.path.dirname(os.path.abspath(__file__)))
@@ -82,7 +84,7 @@ class AsyncRunProcess(Process):
     def run(self):
         result = self.obj.make_move(self.state)
         print(result)
-        self.conn.send(("finish", result))
+        self.conn.send(("finish", result, self.obj.statistics()))
 
 
 class AsyncRun(QtCore.QObject):
@@ -95,6 +97,8 @@ class AsyncRun(QtCore.QObject):
         QtCore.QObject.__init__(self)
         self.obj = obj
         self.state = state
+        # stopWork wakes up the waiting run through this pipe
+        self.stop_conn, self.stop_signal = Pipe(False)
 
     def run(self):
         print("<{}> thinks...".format(self.obj.name()))
@@ -102,14 +106,15 @@ class AsyncRun(QtCore.QObject):
         parent_conn, child_conn = Pipe()
         self.process = AsyncRunProcess(self.obj, self.state, child_conn)
         self.process.start()
-        while not self.stop and not parent_conn.poll():
-            time.sleep(0.1)
+        wait([parent_conn, self.process.sentinel, self.stop_conn])
         if self.stop:
             self.process.terminate()
             self.process.join()
         elif parent_conn.poll():
-            msg, result = parent_conn.recv()
+            msg, result, statistics = parent_conn.recv()
             print("Calculation finished in %.2f seconds" % (time.time() - start_time))
+            if statistics:
+                print("Search statistics:", statistics.to_string())
             self.process.join()
             self.success.emit(result)
         self.finished.emit()
@@ -117,6 +122,7 @@ class AsyncRun(QtCore.QObject):
     def stopWork(self):
         time.sleep(2)
         self.stop = True
+        self.stop_signal.send(True)
 
 
 class OptionsDlg(QtWidgets.QDialog):
@@ -444,11 +450,17 @@ class MainWindow(QtWidgets.QMainWindow):
     
     current_state = None
     board_scene = None
+    on_game = False
+    is_animating = False
     tasks = []
     
     ai_run_thread = None
     ai_run_object = None
     
+    advice_analysis = None
+    advice_lines = 3
+    advice_time_limit = 10
+    
     save_game_results = True
     
 #    board_scene_holes = [[],[]]
@@ -473,6 +485,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.main_timer.timeout.connect(self.update_main_timer)
         self.game_timer = QtCore.QTimer(self)
         self.game_timer.timeout.connect(self.update_game_timer)
+        self.advice_timer = QtCore.QTimer(self)
+        self.advice_timer.timeout.connect(self.update_advice)
+        
+        self.advice_text = QtWidgets.QLabel(self)
+        self.advice_text.setGeometry(QtCore.QRect(200, 290, 480, 42))
+        self.advice_text.setWordWrap(True)
+        self.advice_text.setAlignment(QtCore.Qt.AlignLeft | QtCore.Qt.AlignTop)
         
         self.ui.time_left.hide()
         self.ui.active_player.hide()
@@ -482,7 +501,6 @@ class MainWindow(QtWidgets.QMainWindow):
 #        self.ai_players[1] = self.options["player_2"]!="human"
         self.load_player_methods()
         
-        self.ui.advice.hide()
         self.ui.history.hide()
         self.ui.loadgame.hide()
         self.ui.savegame.hide()
@@ -562,6 +580,7 @@ class MainWindow(QtWidgets.QMainWindow):
             self.ai_levels[1] = self.options["ai_level_2"]
     
     def new_game(self):
+        self.stop_advice()
         self.active_player = 0
         self.is_animating = False
         self.move_result = st.MoveEnds
@@ -604,6 +623,7 @@ class MainWindow(QtWidgets.QMainWindow):
     
     def undo_move(self):
         if self.moves:
+            self.stop_advice()
             move = self.moves.pop()
             self.active_player = move['player']
             self.board_scene.set_active_player(self.active_player)
@@ -623,10 +643,38 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.ui.undo.setEnabled(False)
     
     def advice(self):
-        pass
+        if not self.on_game or self.ai_players[self.active_player] or self.is_animating:
+            return
+        self.stop_advice()
+        self.advice_analysis = Analysis(self.current_state, self.active_player, self.advice_lines,
+                                        self.advice_time_limit)
+        self.advice_analysis.start()
+        self.advice_text.setText("Thinking...")
+        self.advice_timer.start(200)
+        
+    def update_advice(self):
+        if not self.advice_analysis:
+            return
+        update = self.advice_analysis.poll()
+        if update:
+            depth, lines, finished = update
+            msg = "Advice (depth %d%s): " % (depth, finished and ", final" or "")
+            msg += "; ".join(line_to_string(self.current_state, self.active_player, line) for line in lines)
+            self.advice_text.setText(msg)
+        if self.advice_analysis.finished:
+            self.advice_timer.stop()
+            self.advice_analysis = None
+    
+    def stop_advice(self):
+        self.advice_timer.stop()
+        if self.advice_analysis:
+            self.advice_analysis.stop()
+            self.advice_analysis = None
+        self.advice_text.setText("")
     
     def end_game(self):
         if self.on_game:
+            self.stop_advice()
 #            self.main_timer.stop()
             self.game_timer.stop()
             self.on_game = False
@@ -649,6 +697,7 @@ class MainWindow(QtWidgets.QMainWindow):
             
     def end_game_on_time(self):
         if self.on_game:
+            self.stop_advice()
             self.game_timer.stop()
             self.on_game = False
             self.ui.time_left.hide()
@@ -703,6 +752,7 @@ class MainWindow(QtWidgets.QMainWindow):
         if hole<0 or hole>=self.current_state.holes_num() or player!=self.active_player:
             return
         time.sleep(0.1)
+        self.stop_advice()
         
         if not self.ai_players[player]:
             self.moves.append({'state':self.current_state.copy(), 'player':self.active_player})
@@ -827,6 +877,7 @@ class MainWindow(QtWidgets.QMainWindow):
             
     def stop_game(self):
         self.on_game = False
+        self.stop_advice()
         if self.ai_run_thread:
             self.ai_run_thread.wait()
             del self.ai_run_thread
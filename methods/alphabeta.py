@@ -0,0 +1,735 @@
+#!/usr/bin/env python
+"""Alpha-beta method for playing Kalah.
+
+It is a Minimax algorithm (refer to minmax.py) with the following additions:
+
+    Negamax: one function searches for both players. A value of a node is
+        always calculated for the player who moves in it, so an opponent's
+        value is negated.
+    Alpha-beta pruning: the search keeps a window (alpha, beta) of the values
+        that still may change the decision above; as soon as a move gives a
+        value not less than beta the other moves are not searched.
+    Iterative deepening: the tree is searched to the depth 1, 2, 3, ... until
+        the time is over; the best move of the last finished depth is made.
+        A time manager decides when to stop starting new depths (refer to
+        method.TimeManager): forced moves take no time, complex positions
+        and unstable best moves take more.
+    Aspiration windows: each depth starts with a narrow window around the
+        value of the previous depth. Values are small differences of stones,
+        so the guess is usually right and the narrow window prunes more; if
+        the value falls outside, the failed side is widened and the root is
+        searched again.
+    Late move reductions: after the best moves from the table and the extra
+        turns were searched, the remaining quiet moves (no extra turn, no
+        capture) are rarely the best. They are searched to a smaller depth
+        first and searched again to the full depth only if they are better
+        than expected.
+    Futility pruning: near the leaves a quiet move is skipped if the static
+        value of the node plus a margin still doesn't reach alpha.
+    Transposition table: the results of the searched nodes are kept and used
+        when the same position is met again and to search the best move of
+        the previous depth first.
+    Analysis: analyse searches the best moves (multi-PV) instead of the
+        best one and reports their values and principal variations after
+        each depth (refer to analysis.py).
+    Pondering: while the opponent thinks, the method searches the position
+        after its move (i.e. all the opponent's replies). The results stay in
+        the transposition table, so the search of the next move starts from
+        the depth reached during pondering.
+    Analysis cache: the transposition table is filled from a file shared by
+        all games on the first move and its deep entries are written back
+        when the game is over (refer to cache.py).
+    Endgame proofs: when few stones are left in the holes, the proof-number
+        search (refer to pns.py) tries to prove the result of the game first.
+        A proven win or draw is kept by the proving move without any other
+        search; in a proven loss only a shallow search looks for the move
+        that loses the least.
+    Decided games: the stones left in the holes bound the value of a node
+        (the player can't add more than all of them and can't lose more),
+        so a node whose bounds are outside the window is cut at once. When
+        a kalah already has more than half of all stones, the winner is
+        known and the search is shallow as well.
+
+A value of a node counts only the stones that will be added to the kalahs
+from the node on (the stones that are already in the kalahs are the same for
+all moves). So the value depends only on the holes and the player who moves,
+and the same table entry serves all positions with the same holes. It's also
+the value of the endgame tablebase (refer to tablebase.py). The table is keyed
+by the holes as seen by the player who moves (refer to state.canonical_pits),
+so a position and its mirror with the other player to move share one entry.
+
+In the opening the method answers from the opening book (refer to book.py)
+without any search.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from methods.method import Method, SearchStatistics, TimeManager
+from methods.tablebase import load_tablebase, tablebase_path
+from methods.book import load_book, book_path
+from methods.cache import AnalysisCache, cache_path
+from methods.tuning import load_weights, weights_path
+from methods.pns import ProofNumberSearch, Loss
+import state as st
+
+import sqlite3
+import hashlib
+from time import perf_counter
+
+#
+# Types of the values in the transposition table
+#
+
+# The value is exact
+Exact = 0
+# The real value is greater or equal (the search was cut off by beta)
+LowerBound = 1
+# The real value is less or equal (no move was better than alpha)
+UpperBound = 2
+
+
+class SearchTimeout(Exception):
+    """Raised when the search runs out of time"""
+    pass
+
+
+class AlphaBetaMethod(Method):
+    """Class with alpha-beta method for playing Kalah
+
+    Attributes:
+        _max_depth: depth limit of the iterative deepening
+        _aspiration_widths: widening schedule of the aspiration windows: the
+            first width is the initial half-width around the previous value,
+            the next ones are added beyond the failed value on each
+            re-search, then the failed side is opened; empty - no windows
+        _time_share: part of the run time limit after which the search is
+            stopped at once (the hard limit)
+        _use_time_manager: if True then no new depth is started after the
+            soft limit of the time manager, else the search goes on until
+            the hard limit
+        _weights: weights of the differences between the player's and the
+            opponent's evaluation features in _utility (refer to Feature*
+            constants in state.py)
+        _lmr_moves: quiet moves from this index on are reduced (0 - no late
+            move reductions)
+        _lmr_min_depth: the moves are reduced only at this depth or deeper
+        _lmr_reduction: how many plies the late moves are reduced by
+        _futility_margins: margins of the futility pruning by the remaining
+            depth (the item 0 is not used; empty - no futility pruning); they
+            are added to the leaf evaluation (refer to _leaf_value), so they
+            are in its scale
+        _use_tuned_weights: if True then _weights are replaced with the
+            tuned ones (if their file exists, refer to tuning.py); not with
+            a node budget, as the file changes after tuning
+        _batch_leaves: if True then the leaves below each node of depth
+            _batch_plies are evaluated all at once with _evaluate_batch
+            (refer to _prefetch_leaves)
+        _batch_plies: depth of the nodes whose leaves make a batch; deeper
+            gives bigger batches but more of their leaves are pruned
+        _leaf_values: dictionary of the values of the evaluated leaves by
+            their canonical pits
+        _prefetched: dictionary of the (state, neighbors) generated by
+            _prefetch_leaves by the states' ids
+        _use_tablebase: if True then the endgame tablebase is used (if its
+            file exists)
+        _use_book: if True then the opening book is used (if its file exists)
+        _pns_max_stones: the result is proved when there are no more stones
+            in the holes (0 - no proofs)
+        _pns_share: part of the run time limit (or of the node budget, if
+            it's set) the proof may take
+        _decided_depth: depth limit of the search when the result of the
+            game is known (a proven loss or a decided game, refer to
+            KalahState.is_decided)
+        _pns: ProofNumberSearch object; it's kept between moves
+        _table: transposition table; a dictionary with canonical pits keys
+            and (depth, value, type, hole) values; it's kept between moves
+        _max_table_size: the table is cleared when it has more entries
+        _stop_pondering: is_stopped function while pondering, else None
+        _use_cache: if True then the analysis cache is used; not with a
+            node budget, as the cache changes after every game
+        _cache: AnalysisCache object or None
+        _max_cache_entries: number of the deepest cache entries that are
+            loaded into the table
+        _cached_depths: dictionary of the depths of the entries that are
+            in the cache, so only new or deeper entries are written back
+        _cache_min_depth: entries with smaller depth are not cached
+        _nodes: number of searched nodes during the last move
+        _depth: last finished depth of the last move
+        _value: value of the last move
+        Please refer to method.py for other details
+    """
+    _name = "Alpha-beta"
+    _short_name = "Alpha-beta"
+    _disabled = False
+    _max_depth = 64
+    _aspiration_widths = [0.25, 1, 4]
+    _time_share = 0.9
+    _use_time_manager = True
+    _weights = [0.25, 0.0, 0.0, 0.0]
+    _lmr_moves = 3
+    _lmr_min_depth = 3
+    _lmr_reduction = 1
+    _futility_margins = [0, 2]
+    _use_tuned_weights = True
+    _batch_leaves = False
+    _batch_plies = 2
+    _leaf_values = None
+    _prefetched = None
+    _use_tablebase = True
+    _use_book = True
+    _pns_max_stones = 24
+    _pns_share = 0.3
+    _decided_depth = 4
+    _pns = None
+    _tablebase = None
+    _table = None
+    _max_table_size = 1000000
+    _stop_pondering = None
+    _use_cache = True
+    _cache = None
+    _max_cache_entries = 50000
+    _cached_depths = None
+    _cache_min_depth = 4
+    _nodes = 0
+    _depth = 0
+    _value = 0
+
+    def set_max_depth(self, max_depth):
+        """Sets depth limit of the search"""
+        self._max_depth = max_depth
+
+    def _utility(self, state, player):
+        """Calculates a heuristic function value for a state
+
+        It estimates how many stones more than the opponent the player will
+        add to the kalah till the end of the game. Stones in the player's
+        holes are likely to get to the player's kalah.
+
+        The features are kept up to date by the state itself, so there is no
+        need to scan the board.
+
+        Args:
+            state: state to estimate
+            player: player who moves in the state
+
+        Returns:
+            Heuristic value for the player
+        """
+        own, other = state.features(player), state.features(1 - player)
+        weights = self._weights
+        return weights[st.FeatureStones]*(own[st.FeatureStones] - other[st.FeatureStones]) + \
+            weights[st.FeatureEmptyHoles]*(own[st.FeatureEmptyHoles] - other[st.FeatureEmptyHoles]) + \
+            weights[st.FeatureKalahHoles]*(own[st.FeatureKalahHoles] - other[st.FeatureKalahHoles]) + \
+            weights[st.FeatureCapturable]*(own[st.FeatureCapturable] - other[st.FeatureCapturable])
+
+    def _evaluation_parameters(self, holes_num):
+        """Returns a list of everything the values of the search depend on"""
+        return [self._weights, self._lmr_moves, self._lmr_min_depth, self._lmr_reduction,
+                self._futility_margins]
+
+    def _evaluation_version(self, holes_num):
+        """Returns a short hash of the evaluation parameters (refer to
+        cache.cache_path)"""
+        return hashlib.md5(repr(self._evaluation_parameters(holes_num)).encode()).hexdigest()[:8]
+
+    def _new_table(self, holes_num):
+        """Clears the transposition table
+
+        On the first call the tuned weights are loaded and the table is filled
+        from the analysis cache. Both are skipped with a node budget, so the
+        moves depend on nothing but the budget (refer to
+        Method.set_node_limit). When a full table is cleared its deep
+        entries are written to the cache first.
+        """
+        if self._table is not None and self._cache:
+            self._store_cache()
+        if self._table is None and self._use_tuned_weights and not self._node_limit:
+            self._weights = load_weights(weights_path(holes_num)) or self._weights
+        if self._table is None and self._use_cache and not self._node_limit:
+            try:
+                path = cache_path(self._short_name, holes_num, self._evaluation_version(holes_num))
+                self._cache = AnalysisCache(path, self._max_table_size)
+                self._table = self._cache.entries(holes_num, self._max_cache_entries)
+                self._cached_depths = dict((key, entry[0]) for key, entry in self._table.items())
+                return
+            except sqlite3.Error:
+                self._cache = None
+        self._table = {}
+
+    def _store_cache(self):
+        """Writes the deep table entries that are new or deeper than the
+        cached ones to the analysis cache"""
+        cached_depths = self._cached_depths
+        entries = [(key, entry) for key, entry in self._table.items()
+                   if entry[0] >= self._cache_min_depth and entry[0] > cached_depths.get(key, -1)]
+        try:
+            self._cache.store(entries)
+        except sqlite3.Error:
+            return
+        for key, entry in entries:
+            cached_depths[key] = entry[0]
+
+    def _evaluate_batch(self, states, players):
+        """Calculates heuristic function values for a list of states
+
+        Args:
+            states: list of states to estimate
+            players: list of players who move in the states
+
+        Returns:
+            List of heuristic values (refer to _utility)
+        """
+        return [self._utility(state, player) for state, player in zip(states, players)]
+
+    def _prefetch_leaves(self, state, player, depth):
+        """Evaluates the leaves depth moves below a node with one
+        _evaluate_batch call
+
+        The search below the node isn't changed (the pruning works as usual):
+        it takes the generated moves from _prefetched and the values of the
+        leaves from _leaf_values. Some of the evaluated leaves are pruned
+        later, which costs much less than an _evaluate_batch call per leaf.
+        """
+        start = perf_counter()
+        prefetched = self._prefetched = {}
+        nodes = [(state, player)]
+        for ply in range(depth):
+            children = []
+            for node_state, node_player in nodes:
+                if not node_state.is_finished(node_player):
+                    neighbors = node_state.get_neighbors(node_player)
+                    prefetched[id(node_state)] = (node_state, neighbors)
+                    children += [(neighbor['state'], neighbor['player']) for neighbor in neighbors]
+            nodes = children
+        self._statistics.generation_time += perf_counter() - start
+
+        leaf_values, keys, states, players = self._leaf_values, [], [], []
+        for leaf_state, leaf_player in nodes:
+            key = leaf_state.canonical_pits(leaf_player)
+            if key not in leaf_values and not leaf_state.is_finished(leaf_player):
+                leaf_values[key] = None
+                keys.append(key)
+                states.append(leaf_state)
+                players.append(leaf_player)
+        if states:
+            start = perf_counter()
+            leaf_values.update(zip(keys, self._evaluate_batch(states, players)))
+            self._statistics.evaluation_time += perf_counter() - start
+
+    def _prefetched_neighbors(self, state):
+        """Returns the neighbors of a state generated by _prefetch_leaves or
+        None"""
+        entry = self._prefetched.pop(id(state), None)
+        return entry[1] if entry and entry[0] is state else None
+
+    def _leaf_value(self, state, player, key):
+        """Returns a heuristic value of a leaf (with _batch_leaves it's taken
+        from the values of _prefetch_leaves)"""
+        if not self._batch_leaves:
+            return self._utility(state, player)
+        value = self._leaf_values.get(key)
+        if value is None:
+            value = self._evaluate_batch([state], [player])[0]
+        return value
+
+    def _new_leaf_values(self):
+        """Clears the values of _prefetch_leaves"""
+        self._leaf_values = {}
+        self._prefetched = {}
+
+    def _is_stopped(self):
+        """Checks if the search should be stopped
+
+        While pondering it's stopped by the harness, otherwise by the node
+        budget (if it's set) or by the time limit.
+        """
+        if self._stop_pondering:
+            return self._stop_pondering()
+        if self._node_limit:
+            return self._nodes >= self._node_limit
+        return self.is_time_expired(self._run_time_limit*self._time_share)
+
+    def _ordered_neighbors(self, state, player, first_hole=None, neighbors=None):
+        """Returns the neighbors in the order they should be searched
+
+        The best move from the transposition table goes first, then the moves
+        with an extra turn, then the others. The neighbors are generated
+        unless they are given.
+        """
+        def priority(neighbor):
+            if neighbor['hole'][0] == first_hole:
+                return 0
+            if neighbor['result'] == st.MoveEndsInPlayersKalah:
+                return 1
+            return 2
+        if neighbors is None:
+            start = perf_counter()
+            neighbors = state.get_neighbors(player)
+            self._statistics.generation_time += perf_counter() - start
+        return sorted(neighbors, key=priority)
+
+    def _is_quiet(self, state, player, neighbor):
+        """Checks if a move gives no extra turn and captures nothing
+
+        A capture adds at least two stones to the kalah; one stone can get
+        there only by passing it.
+        """
+        return neighbor['player'] != player and \
+            neighbor['state'].player_kalah(player) - state.player_kalah(player) <= 1
+
+    def _child_value(self, state, player, neighbor, depth, alpha, beta):
+        """Searches a neighbor and returns its value for the player"""
+        new_state = neighbor['state']
+        gain = new_state.player_kalah(player) - state.player_kalah(player)
+        if neighbor['player'] == player:
+            return gain + self._search(new_state, player, depth - 1, alpha - gain, beta - gain)
+        return gain - self._search(new_state, neighbor['player'], depth - 1, gain - beta, gain - alpha)
+
+    def _search(self, state, player, depth, alpha, beta):
+        """Negamax search with alpha-beta pruning
+
+        Args:
+            state: state to search
+            player: player who moves in the state
+            depth: remaining depth
+            alpha: the value the player already has somewhere above
+            beta: the value the opponent already has somewhere above
+
+        Returns:
+            Value of the state for the player. If it's not greater than alpha
+            then it's an upper bound of the real value, if it's not less than
+            beta then it's a lower bound.
+        """
+        self._nodes += 1
+        if self._is_stopped():
+            raise SearchTimeout()
+
+        key = state.canonical_pits(player)
+        if state.is_finished(player):
+            return -sum(key)
+        if self._tablebase:
+            value = self._tablebase.probe_pits(key, 0)
+            if value is not None:
+                return value
+        # the player adds at most all the stones in the holes and loses at
+        # most all of them
+        stones = sum(key)
+        if stones <= alpha:
+            return stones
+        if -stones >= beta:
+            return -stones
+        statistics = self._statistics
+        if depth <= 0:
+            start = perf_counter()
+            value = self._leaf_value(state, player, key)
+            statistics.evaluation_time += perf_counter() - start
+            return value
+
+        entry = self._table.get(key)
+        first_hole = None
+        statistics.table_probes += 1
+        if entry:
+            statistics.table_hits += 1
+            entry_depth, value, value_type, first_hole = entry
+            if entry_depth >= depth:
+                if value_type == Exact or \
+                        (value_type == LowerBound and value >= beta) or \
+                        (value_type == UpperBound and value <= alpha):
+                    return value
+
+        neighbors = None
+        if self._batch_leaves and 0 < depth <= self._batch_plies:
+            # the nodes below a node of depth _batch_plies are already
+            # prefetched; the others (e.g. after a reduction) are not
+            if depth == self._batch_plies or id(state) not in self._prefetched:
+                self._prefetch_leaves(state, player, depth)
+            neighbors = self._prefetched_neighbors(state)
+
+        futility_value = None
+        if depth < len(self._futility_margins) and alpha > -float('inf'):
+            futility_value = self._leaf_value(state, player, key) + self._futility_margins[depth]
+            if futility_value > alpha:
+                futility_value = None
+        reduce = self._lmr_moves and depth >= self._lmr_min_depth
+
+        original_alpha = alpha
+        best_value, best_hole = -float('inf'), None
+        for index, neighbor in enumerate(self._ordered_neighbors(state, player, first_hole, neighbors)):
+            quiet = (futility_value is not None or reduce) and index and self._is_quiet(state, player, neighbor)
+            if quiet and futility_value is not None:
+                best_value = max(best_value, futility_value)
+                continue
+            value = None
+            if quiet and index >= self._lmr_moves:
+                value = self._child_value(state, player, neighbor, depth - self._lmr_reduction, alpha, beta)
+            if value is None or value > alpha:
+                value = self._child_value(state, player, neighbor, depth, alpha, beta)
+            if value > best_value:
+                best_value, best_hole = value, neighbor['hole'][0]
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                statistics.add_cutoff(index)
+                break
+
+        if best_value <= original_alpha:
+            value_type = UpperBound
+        elif best_value >= beta:
+            value_type = LowerBound
+        else:
+            value_type = Exact
+        self._table[key] = (depth, best_value, value_type, best_hole)
+        return best_value
+
+    def _search_root(self, state, depth, first_hole=None, alpha=-float('inf'), beta=float('inf')):
+        """Searches all moves of the state to the depth within a window
+
+        Returns:
+            A tuple of the best value and the best hole. If the value is not
+            greater than alpha (fail low) then the hole means nothing, if it's
+            not less than beta (fail high) then the hole is at least as good.
+        """
+        best_value, best_hole = -float('inf'), None
+        for neighbor in self._ordered_neighbors(state, self._player, first_hole):
+            value = self._child_value(state, self._player, neighbor, depth, alpha, beta)
+            if value > best_value:
+                best_value, best_hole = value, neighbor['hole'][0]
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+        return best_value, best_hole
+
+    def _aspiration_search(self, state, depth, first_hole=None):
+        """Searches the root with aspiration windows around the previous value
+
+        Returns:
+            A tuple of the best value and the best hole
+        """
+        widths = self._aspiration_widths
+        if not widths or not self._depth:
+            return self._search_root(state, depth, first_hole)
+        alpha, beta = self._value - widths[0], self._value + widths[0]
+        for research in range(1, len(widths) + 1):
+            width = widths[research] if research < len(widths) else float('inf')
+            value, hole = self._search_root(state, depth, first_hole, alpha, beta)
+            if value <= alpha:
+                self._statistics.fail_lows += 1
+                alpha = value - width
+            elif value >= beta:
+                self._statistics.fail_highs += 1
+                first_hole = hole
+                beta = value + width
+            else:
+                return value, hole
+        # the window may still fail on the other side, so the last search is
+        # a full-window one and its value is exact
+        return self._search_root(state, depth, first_hole)
+
+    def _book_move(self, state):
+        """Returns a move from the opening book or None"""
+        book = load_book(book_path(state.holes_num()))
+        if not book:
+            return None
+        hole = book.probe(state, self._player)
+        if hole is None or not 0 <= hole < state.holes_num() or not state.player_holes(self._player)[hole]:
+            return None
+        return hole
+
+    def _prove(self, state):
+        """Proves the result of the game with the proof-number search
+
+        The proof's nodes are counted in the method's nodes.
+
+        Returns:
+            A tuple of the result (refer to pns.ProofNumberSearch.result)
+            and the hole that keeps a won or drawn game
+        """
+        if self._pns is None:
+            self._pns = ProofNumberSearch(state.holes_num(), tablebase=self._tablebase)
+        max_nodes, is_stopped = int(self._node_limit*self._pns_share), None
+        if not self._node_limit:
+            time_limit = self._run_time_limit*self._pns_share
+            is_stopped = lambda: self.is_time_expired(time_limit)
+        result = self._pns.result(state, self._player, max_nodes, is_stopped)
+        self._nodes += self._pns.nodes()
+        return result
+
+    def _search_lines(self, state, depth, lines, first_hole=None):
+        """Searches the best moves of the root to the depth (multi-PV)
+
+        A move only needs to be better than the last of the best moves found
+        so far, so the others are searched with that value as alpha.
+
+        Returns:
+            A list of (value, hole) of at most lines best moves, best first
+        """
+        best = []
+        for neighbor in self._ordered_neighbors(state, self._player, first_hole):
+            alpha = best[-1][0] if len(best) >= lines else -float('inf')
+            value = self._child_value(state, self._player, neighbor, depth, alpha, float('inf'))
+            if value > alpha:
+                best.append((value, neighbor['hole'][0]))
+                best.sort(key=lambda line: -line[0])
+                del best[lines:]
+        return best
+
+    def _principal_variation(self, state, hole, max_length):
+        """Returns a list of (player, hole) moves that starts with the hole
+        and goes on with the best moves from the transposition table"""
+        state, player = state.copy(), self._player
+        variation = []
+        while hole is not None and len(variation) < max_length and state.player_holes(player)[hole]:
+            variation.append((player, hole))
+            if state.move(player, hole, record=False) != st.MoveEndsInPlayersKalah:
+                player = 1 - player
+            if state.is_finished(player):
+                break
+            entry = self._table.get(state.canonical_pits(player))
+            hole = entry and entry[3]
+        return variation
+
+    def analyse(self, state, lines=3, callback=None):
+        """Analyses the best moves of the player in the state
+
+        The search deepens until the time limit (or the node budget) is over
+        or the depth limit is reached; the book and the proofs are not used.
+
+        Args:
+            state: state to analyse
+            lines: number of the best moves
+            callback: function that is called with (depth, analysis) after
+                each finished depth
+
+        Returns:
+            A list of (value, variation) of the last finished depth, best
+            first; value is what the player will add to the kalah more than
+            the opponent (refer to the values of the search) and variation
+            is a list of (player, hole) moves that starts with the move
+        """
+        self._start_search(state)
+        analysis = []
+        for depth in range(1, self._max_depth + 1):
+            try:
+                best = self._search_lines(state, depth, lines, analysis and analysis[0][1][0][1])
+            except SearchTimeout:
+                break
+            if not best:
+                break
+            self._depth = depth
+            analysis = [(value, self._principal_variation(state, hole, depth)) for value, hole in best]
+            if callback:
+                callback(depth, analysis)
+        self._statistics.nodes, self._statistics.depth = self._nodes, self._depth
+        return analysis
+
+    def _start_search(self, state):
+        """Prepares the tables and counters for a search of the state"""
+        # the cache is read (or written) before the move's timer starts
+        if self._table is None or len(self._table) > self._max_table_size:
+            self._new_table(state.holes_num())
+        super(AlphaBetaMethod, self).make_move(state)
+        self._nodes = 0
+        self._depth = 0
+        self._new_leaf_values()
+        self._tablebase = self._use_tablebase and load_tablebase(tablebase_path(state.holes_num())) or None
+
+    def make_move(self, state):
+        """Makes a decision of the player's next move
+
+        Args:
+            state: current board state
+
+        Returns:
+            Player's hole number which defines a player's next move
+        """
+        self._start_search(state)
+        neighbors = state.get_neighbors(self._player)
+        if not neighbors:
+            return -1
+        if len(neighbors) == 1:
+            return neighbors[0]['hole'][0]
+
+        if self._use_book:
+            hole = self._book_move(state)
+            if hole is not None:
+                return hole
+
+        max_depth = self._max_depth
+        if self._pns_max_stones and sum(state.get_pits()) <= self._pns_max_stones:
+            result, hole = self._prove(state)
+            if hole is not None:
+                self._statistics.nodes = self._nodes
+                return hole
+            if result == Loss:
+                max_depth = min(max_depth, self._decided_depth)
+        if state.is_decided():
+            max_depth = min(max_depth, self._decided_depth)
+
+        time_manager = None
+        if self._use_time_manager and not self._node_limit:
+            time_manager = TimeManager(self._running_timer, self._run_time_limit,
+                                       self._run_time_limit*self._time_share,
+                                       len(state.get_all_neighbors(self._player)), state.holes_num())
+        best_hole = neighbors[0]['hole'][0]
+        for depth in range(1, max_depth + 1):
+            try:
+                self._value, best_hole = self._aspiration_search(state, depth, best_hole)
+            except SearchTimeout:
+                break
+            self._depth = depth
+            if time_manager and not time_manager.next_iteration(best_hole):
+                break
+        self._statistics.nodes, self._statistics.depth = self._nodes, self._depth
+        return best_hole
+
+    def ponder(self, state, player, is_stopped):
+        """Searches the state deeper and deeper until is_stopped() is True
+
+        Args:
+            Please refer to Method.ponder for details
+        """
+        if self._table is None or len(self._table) > self._max_table_size:
+            self._new_table(state.holes_num())
+        self._tablebase = self._use_tablebase and load_tablebase(tablebase_path(state.holes_num())) or None
+        # the statistics of the move are already sent
+        self._statistics = SearchStatistics()
+        self._new_leaf_values()
+        self._stop_pondering = is_stopped
+        try:
+            for depth in range(1, self._max_depth + 1):
+                self._search(state, player, depth, -float('inf'), float('inf'))
+        except SearchTimeout:
+            pass
+        finally:
+            self._stop_pondering = None
+
+    def game_over(self):
+        """Writes the new deep transposition table entries to the analysis cache"""
+        if self._cache and self._table:
+            self._store_cache()
+
+
+#
+# You can test method while changing the board state below and simply executing
+# this module from the project's root folder: python -m methods.alphabeta
+#
+if __name__ == "__main__":
+    state = st.KalahState(4)
+    method = AlphaBetaMethod(0, run_time_limit=5)
+    print(method.make_move(state), "depth", method._depth, "value", method._value, "nodes", method._nodes)
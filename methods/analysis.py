@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+"""Background analysis of Kalah positions.
+
+An Analysis runs AlphaBetaMethod.analyse for a position in a separate process
+and collects the best moves with their values and principal variations as
+the search gets deeper. The caller polls it without waiting (e.g. from a GUI
+timer), so the event loop is never blocked:
+
+    analysis = Analysis(state, player, lines=3, time_limit=10)
+    analysis.start()
+    ...
+    update = analysis.poll()    # (depth, lines, finished) or None
+    ...
+    analysis.stop()
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+
+import sys
+import time
+from multiprocessing import Process, Pipe
+
+
+class AnalysisProcess(Process):
+    """Class that analyses a position in a separate process
+
+    It sends ("lines", depth, lines) after each depth and ("finish", depth,
+    lines) at the end (refer to AlphaBetaMethod.analyse for the lines)
+    """
+    def __init__(self, state, player, lines, time_limit, conn):
+        Process.__init__(self)
+        # the analysis doesn't outlive its caller
+        self.daemon = True
+        self.state = state.copy()
+        self.player = player
+        self.lines = lines
+        self.time_limit = time_limit
+        self.conn = conn
+
+    def run(self):
+        from methods.alphabeta import AlphaBetaMethod
+        method = AlphaBetaMethod(self.player, run_time_limit=self.time_limit)
+        lines = method.analyse(self.state, self.lines,
+                               lambda depth, lines: self.conn.send(("lines", depth, lines)))
+        self.conn.send(("finish", method._depth, lines))
+
+
+class Analysis(object):
+    """Class that runs an analysis in the background and keeps its results
+
+    Attributes:
+        depth: last finished depth
+        lines: list of (value, variation) of the last finished depth (refer
+            to AlphaBetaMethod.analyse)
+        finished: True when the analysis is over
+    """
+    depth = 0
+    lines = None
+    finished = False
+
+    def __init__(self, state, player, lines=3, time_limit=10):
+        """Inits an analysis
+
+        Args:
+            state: state to analyse
+            player: player who moves in the state
+            lines: number of the best moves
+            time_limit: time limit of the analysis in seconds
+        """
+        self.lines = []
+        self._parent_conn, child_conn = Pipe()
+        self._process = AnalysisProcess(state, player, lines, time_limit, child_conn)
+
+    def start(self):
+        """Starts the analysis process"""
+        self._process.start()
+
+    def poll(self):
+        """Takes the results that came from the process without waiting
+
+        Returns:
+            A tuple (depth, lines, finished) if there are new results, else
+            None
+        """
+        updated = False
+        try:
+            while not self.finished and self._parent_conn.poll():
+                msg, self.depth, self.lines = self._parent_conn.recv()
+                self.finished = msg == "finish"
+                updated = True
+        except (EOFError, OSError):
+            self.finished = updated = True
+        if self.finished:
+            self._process.join()
+        return (self.depth, self.lines, self.finished) if updated else None
+
+    def stop(self):
+        """Stops the analysis process"""
+        if self._process.is_alive():
+            self._process.terminate()
+        self._process.join()
+        self.finished = True
+
+
+def line_to_string(state, player, line):
+    """Returns a readable text of an analysis line
+
+    The value is shown as the final difference of the kalahs and the holes
+    are numbered from 1 with the player's number before a player's move
+
+    Args:
+        state: analysed state
+        player: player who moves in the state
+        line: (value, variation) tuple
+    """
+    value, variation = line
+    value += state.player_kalah(player) - state.player_kalah(1 - player)
+    moves = " ".join("%d:%d" % (move_player + 1, hole + 1) for move_player, hole in variation)
+    return "%+.1f  %s" % (value, moves)
+
+
+#
+# Analyses the initial position. Run from the project's root folder:
+#     python -m methods.analysis [seconds] [lines]
+#
+if __name__ == "__main__":
+    time_limit = len(sys.argv) > 1 and int(sys.argv[1]) or 5
+    lines = len(sys.argv) > 2 and int(sys.argv[2]) or 3
+    state = st.KalahState(4)
+    analysis = Analysis(state, 0, lines, time_limit)
+    analysis.start()
+    depth = 0
+    while not analysis.finished:
+        update = analysis.poll()
+        if update and update[0] != depth:
+            depth = update[0]
+            print("Depth %d:" % depth)
+            for line in update[1]:
+                print("   ", line_to_string(state, 0, line))
+        time.sleep(0.1)
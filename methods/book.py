@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+"""Opening book for Kalah.
+
+Every game starts from the same position, so the best moves of the first
+plies can be searched once (deeply, on many cores) and stored. Methods answer
+the opening moves from the book and save their time for the middle game.
+
+The best move depends only on the holes and the player who moves (refer to
+alphabeta.py), so a position is keyed by a 64-bit hash of the holes as seen
+by the player who moves (refer to position_key and state.canonical_pits); a
+position and its mirror share one key. Positions of all standard numbers of stones (3 - 6) are kept
+in one file per holes_num.
+
+File format (little-endian):
+    header: 8 bytes of FileMagic, holes_num and number of positions as uint32
+    keys: sorted position keys as uint64
+    moves: one byte (hole number) per key
+
+Methods open the file with mmap (refer to load_book) and find a position by
+binary search over the keys.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+
+import os
+import sys
+import mmap
+import struct
+from hashlib import blake2b
+from multiprocessing import Pool
+
+FileMagic = b'KALAHBK2'
+HeaderFormat = '<8sII'
+HeaderSize = struct.calcsize(HeaderFormat)
+KeyFormat = '<Q'
+KeySize = struct.calcsize(KeyFormat)
+BookFolder = 'books'
+
+
+def book_path(holes_num, folder=BookFolder):
+    """Returns a default file name of the opening book for holes_num"""
+    return os.path.join(folder, 'kalah-%d.bk' % holes_num)
+
+
+def position_key(pits, player):
+    """Returns a 64-bit key of the position
+
+    Args:
+        pits: tuple of the holes' contents (refer to KalahState.get_pits)
+        player: player who moves
+    """
+    pits = st.canonical_pits(pits, len(pits) // 2, player)
+    return int.from_bytes(blake2b(bytes(pits), digest_size=KeySize).digest(), 'little')
+
+
+class OpeningBook(object):
+    """Class that reads an opening book file
+
+    Attributes:
+        _holes_num: number of holes of each player
+        _size: number of positions
+        _file: opened book file
+        _map: memory map of the file
+    """
+    _holes_num = 6
+    _size = 0
+    _file = None
+    _map = None
+
+    def __init__(self, path):
+        """Opens an opening book file
+
+        Args:
+            path: file name
+        Raises:
+            ValueError if the file is not an opening book
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._holes_num, self._size = struct.unpack_from(HeaderFormat, self._map)
+        if magic != FileMagic or len(self._map) != HeaderSize + (KeySize + 1)*self._size:
+            self.close()
+            raise ValueError("%s is not a Kalah opening book" % path)
+
+    def holes_num(self):
+        """Returns number of holes"""
+        return self._holes_num
+
+    def size(self):
+        """Returns number of positions"""
+        return self._size
+
+    def probe_pits(self, pits, player):
+        """Returns the best hole for the position given by pits or None"""
+        key = position_key(pits, player)
+        low, high = 0, self._size
+        while low < high:
+            middle = (low + high) // 2
+            middle_key = struct.unpack_from(KeyFormat, self._map, HeaderSize + KeySize*middle)[0]
+            if middle_key < key:
+                low = middle + 1
+            elif middle_key > key:
+                high = middle
+            else:
+                return self._map[HeaderSize + KeySize*self._size + middle]
+        return None
+
+    def probe(self, state, player):
+        """Returns the best hole for the state or None if it's not in the book
+
+        Args:
+            state: KalahState object
+            player: player who moves
+        """
+        if state.holes_num() != self._holes_num:
+            return None
+        return self.probe_pits(state.get_pits(), player)
+
+    def close(self):
+        """Closes the file"""
+        if self._map:
+            self._map.close()
+            self._map = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+_books = {}
+
+
+def load_book(path):
+    """Returns an OpeningBook for the file or None if there's no such file
+
+    The book is opened once per process and is kept for the later calls
+    """
+    if path not in _books:
+        try:
+            _books[path] = OpeningBook(path)
+        except (OSError, ValueError):
+            _books[path] = None
+    return _books[path]
+
+
+def opening_positions(stones, holes_num=6, plies=4):
+    """Returns all positions reachable from the start in up to plies moves
+
+    A ply is one move of one hole (an extra turn is a separate ply).
+
+    Returns:
+        A list of (state, player) tuples with unique positions that are not
+        finished
+    """
+    positions = {}
+    level = [(st.KalahState(stones, holes_num), 0)]
+    for ply in range(plies + 1):
+        next_level = []
+        for state, player in level:
+            key = state.canonical_pits(player)
+            if key in positions or state.is_finished(player):
+                continue
+            positions[key] = (state, player)
+            if ply < plies:
+                next_level += [(neighbor['state'], neighbor['player']) for neighbor in state.get_neighbors(player)]
+        level = next_level
+    return list(positions.values())
+
+
+def _search_position(args):
+    """Searches one position in a pool's process; returns (key, hole)"""
+    from methods.alphabeta import AlphaBetaMethod
+    state, player, depth, time_limit = args
+    method = AlphaBetaMethod(player, run_time_limit=time_limit)
+    method._use_book = False
+    method.set_max_depth(depth)
+    return position_key(state.get_pits(), player), method.make_move(state)
+
+
+def build(path, holes_num=6, stones_list=(3, 4, 5, 6), plies=4, depth=12, time_limit=float('inf'),
+          processes=None, be_silent=False):
+    """Builds an opening book file
+
+    Args:
+        path: file name
+        holes_num: number of holes of each player
+        stones_list: numbers of stones in each hole on game startup
+        plies: number of the opening plies to store
+        depth: search depth of each position
+        time_limit: search time limit of each position in seconds
+        processes: size of the process pool (default: number of CPUs)
+        be_silent: if True then progress is not printed
+    """
+    tasks = []
+    for stones in stones_list:
+        positions = opening_positions(stones, holes_num, plies)
+        tasks += [(state, player, depth, time_limit) for state, player in positions]
+        if not be_silent:
+            print("%d stones: %d positions" % (stones, len(positions)))
+
+    moves = {}
+    with Pool(processes) as pool:
+        for key, hole in pool.imap_unordered(_search_position, tasks):
+            if hole >= 0:
+                moves[key] = hole
+            if not be_silent and len(moves) % 100 == 0:
+                print("%d of %d positions searched" % (len(moves), len(tasks)))
+
+    keys = sorted(moves)
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'wb') as f:
+        f.write(struct.pack(HeaderFormat, FileMagic, holes_num, len(keys)))
+        for key in keys:
+            f.write(struct.pack(KeyFormat, key))
+        f.write(bytes(moves[key] for key in keys))
+
+
+#
+# Builds an opening book. Run from the project's root folder:
+#     python -m methods.book [plies] [depth] [processes]
+#
+if __name__ == "__main__":
+    plies = len(sys.argv) > 1 and int(sys.argv[1]) or 4
+    depth = len(sys.argv) > 2 and int(sys.argv[2]) or 12
+    processes = len(sys.argv) > 3 and int(sys.argv[3]) or None
+    build(book_path(6), plies=plies, depth=depth, processes=processes)
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+"""Persistent analysis cache for Kalah.
+
+Tournament games go through the same positions again and again, but each
+game starts with an empty transposition table. This module keeps searched
+values in an SQLite file that is shared by all games:
+
+    - a search method reads the cache when it starts (refer to entries),
+    - and writes its deep transposition table entries back in one batch when
+      the game is finished (refer to store).
+
+An entry is kept only if it was searched deeper than the one already stored.
+Values depend on the evaluation and the pruning of the method, so the file
+name carries a version of them: after tuning of the weights a new file is
+started instead of serving the stale values.
+When the file has more than max_size entries the shallowest (and then the
+oldest) entries are evicted.
+
+The file is opened in the write-ahead log mode, so parallel games can read it
+while another game writes its results; writers wait for each other.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import closing
+
+CacheFolder = 'caches'
+
+
+def cache_path(method_name, holes_num, version=None, folder=CacheFolder):
+    """Returns a default file name of the method's cache for holes_num
+
+    Values depend on the method's evaluation, so every method (and every
+    version of its evaluation, e.g. a hash of the weights) has its own cache.
+    """
+    name = method_name.replace(' ', '')
+    if version:
+        name += '-' + version
+    return os.path.join(folder, '%s-%d.db' % (name, holes_num))
+
+
+def _to_blob(pits):
+    return bytes(pits)
+
+
+def _from_blob(blob):
+    return tuple(blob)
+
+
+class AnalysisCache(object):
+    """Class that reads and writes an analysis cache file
+
+    Entries are the transposition table entries: canonical pits keys (refer
+    to state.canonical_pits) and (depth, value, type, hole) values.
+
+    Attributes:
+        _path: file name
+        _max_size: maximum number of entries in the file
+    """
+    _path = None
+    _max_size = 500000
+
+    def __init__(self, path, max_size=500000):
+        """Opens (or creates) a cache file
+
+        Args:
+            path: file name
+            max_size: maximum number of entries in the file
+        """
+        self._path = path
+        self._max_size = max_size
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder, exist_ok=True)
+        with closing(self._connect()) as connection, connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS positions ("
+                               "key BLOB PRIMARY KEY, depth INTEGER, value REAL, type INTEGER, "
+                               "hole INTEGER, updated REAL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS eviction ON positions (depth, updated)")
+
+    def _connect(self):
+        return sqlite3.connect(self._path, timeout=60)
+
+    def entries(self, holes_num, limit=None):
+        """Returns a dictionary of the entries for holes_num
+
+        Args:
+            holes_num: number of holes of each player
+            limit: maximum number of entries (the deepest ones are returned)
+        """
+        query = "SELECT key, depth, value, type, hole FROM positions WHERE length(key) = ? ORDER BY depth DESC"
+        parameters = [2*holes_num]
+        if limit:
+            query += " LIMIT ?"
+            parameters.append(limit)
+        with closing(self._connect()) as connection, connection:
+            return dict((_from_blob(key), (depth, value, value_type, hole))
+                        for key, depth, value, value_type, hole in connection.execute(query, parameters))
+
+    def store(self, entries):
+        """Writes entries in one transaction and evicts the extra ones
+
+        Args:
+            entries: iterable of (pits, (depth, value, type, hole))
+        """
+        now = time.time()
+        rows = [(_to_blob(pits), depth, value, value_type, hole, now)
+                for pits, (depth, value, value_type, hole) in entries]
+        with closing(self._connect()) as connection, connection:
+            connection.executemany("INSERT INTO positions (key, depth, value, type, hole, updated) "
+                                   "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (key) DO UPDATE SET "
+                                   "depth = excluded.depth, value = excluded.value, type = excluded.type, "
+                                   "hole = excluded.hole, updated = excluded.updated "
+                                   "WHERE excluded.depth >= positions.depth", rows)
+            extra = connection.execute("SELECT count(*) FROM positions").fetchone()[0] - self._max_size
+            if extra > 0:
+                connection.execute("DELETE FROM positions WHERE key IN "
+                                   "(SELECT key FROM positions ORDER BY depth, updated LIMIT ?)", (extra,))
+
+    def size(self):
+        """Returns number of entries in the file"""
+        with closing(self._connect()) as connection, connection:
+            return connection.execute("SELECT count(*) FROM positions").fetchone()[0]
@@ -0,0 +1,413 @@
+#!/usr/bin/env python
+"""Monte-Carlo tree search method for playing Kalah.
+
+The method builds a searching tree in which every node keeps statistics of
+the random games (rollouts) played through it. On each iteration it:
+
+    1) selects a leaf going down the tree with the UCT rule,
+    2) expands the leaf with one of its untried moves,
+    3) plays a random game from the new node up to the end (rollout),
+    4) propagates the rollout result back up to the root.
+
+When the time is over (or the node budget of rollouts is spent, refer to
+Method.set_node_limit) the move of the most visited root child is made.
+
+One process can make only a limited number of rollouts per move, so there are
+two parallel modes that spread the work across several worker processes:
+
+    Root parallelization: every worker grows its own independent tree from
+        the current state; at the deadline the visit counts of the root
+        children are summed up over all trees.
+    Tree parallelization: one tree is kept in the main process, the selected
+        leaves are played out by the workers. While a rollout is running its
+        path is marked with a virtual loss (the visits are counted before the
+        result is known), so the next selections spread to other branches.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from methods.method import Method
+from methods.tablebase import load_tablebase, tablebase_path
+import state as st
+
+import os
+from math import log, sqrt
+from collections import deque
+from random import Random
+from time import time
+from multiprocessing import Pool
+
+#
+# Parallel modes
+#
+
+# Sequential search in the method's process
+NoParallel = None
+# Independent trees in the worker processes; root visit counts are merged
+RootParallel = "root"
+# One shared tree; rollouts are played by the worker processes
+TreeParallel = "tree"
+
+
+def _rollout(state, player, rng, tablebase=None):
+    """Plays a random game from the state up to the end
+
+    The game is stopped as soon as its exact result is found in the endgame
+    tablebase.
+
+    Args:
+        state: state to start from (it's not changed)
+        player: player who moves in the state
+        rng: random numbers generator
+        tablebase: Tablebase object or None
+
+    Returns:
+        Difference between the final scores of player 0 and player 1
+    """
+    state = state.copy()
+    while not state.is_finished(player):
+        if tablebase:
+            value = tablebase.probe(state, player)
+            if value is not None:
+                return state.player_kalah(0) - state.player_kalah(1) + (value if player == 0 else -value)
+        holes = state.player_holes(player)
+        candidates = [hole for hole in range(state.holes_num()) if holes[hole]]
+        if state.move(player, rng.choice(candidates), record=False) != st.MoveEndsInPlayersKalah:
+            player = (player + 1) % 2
+    score = state.end_game()
+    return score[0] - score[1]
+
+
+def _rollout_task(state, player, seed, tablebase_file=None):
+    """Rollout that is run by a worker process"""
+    return _rollout(state, player, Random(seed), tablebase_file and load_tablebase(tablebase_file))
+
+
+def _reward(score, player):
+    """Converts a rollout result to the reward (1, 0.5 or 0) for the player"""
+    if not score:
+        return 0.5
+    return 1.0 if (score > 0) == (player == 0) else 0.0
+
+
+class _Node(object):
+    """Node of the searching tree
+
+    Attributes:
+        state: game state of the node
+        player: player who moves in the state
+        holes: holes of the move that leads from the parent to this node
+        parent: parent node (None for the root)
+        children: list of the expanded children
+        untried: list of the neighbors that are not expanded yet
+        visits: number of the rollouts through the node (including the
+            running ones, i.e. virtual losses)
+        wins: sum of the rewards for the player who moved to this node
+    """
+
+    def __init__(self, state, player, holes=None, parent=None):
+        self.state = state
+        self.player = player
+        self.holes = holes
+        self.parent = parent
+        self.children = []
+        self.untried = None
+        self.visits = 0
+        self.wins = 0.0
+
+    def is_terminal(self):
+        """Checks if the game is finished in the node"""
+        return self.state.is_finished(self.player)
+
+    def is_expanded(self):
+        """Checks if all the node's moves are expanded"""
+        return self.untried is not None and not self.untried
+
+    def expand(self):
+        """Adds a child for one of the untried moves and returns it"""
+        if self.untried is None:
+            self.untried = self.state.get_all_neighbors(self.player)
+        neighbor = self.untried.pop()
+        child = _Node(neighbor['state'], neighbor['player'], neighbor['hole'], self)
+        self.children.append(child)
+        return child
+
+    def best_child(self, exploration):
+        """Returns a child with the maximum UCT value"""
+        log_visits = log(self.visits)
+        return max(self.children,
+                   key=lambda child: child.wins / child.visits + exploration * sqrt(log_visits / child.visits))
+
+    def root_visits(self):
+        """Returns a dictionary of the children's visits by their moves"""
+        return dict((tuple(child.holes), child.visits) for child in self.children)
+
+
+def _select(root, exploration):
+    """Goes down the tree, expands a leaf and returns it
+
+    The visits are counted on the way down, so until the result is propagated
+    the path has a virtual loss.
+    """
+    node = root
+    node.visits += 1
+    while not node.is_terminal():
+        if not node.is_expanded():
+            node = node.expand()
+            node.visits += 1
+            break
+        node = node.best_child(exploration)
+        node.visits += 1
+    return node
+
+
+def _backpropagate(node, score):
+    """Propagates the rollout result from the node up to the root"""
+    while node.parent is not None:
+        node.wins += _reward(score, node.parent.player)
+        node = node.parent
+
+
+def _grow_tree(state, player, deadline, exploration, seed, tablebase_file=None, max_rollouts=0):
+    """Grows a tree from the state until the deadline or max_rollouts rollouts
+    (0 - no limit)
+
+    Returns:
+        A tuple of the root children's visits and the number of rollouts
+    """
+    rng = Random(seed)
+    tablebase = tablebase_file and load_tablebase(tablebase_file)
+    root = _Node(state, player)
+    rollouts = 0
+    while time() < deadline and (not max_rollouts or rollouts < max_rollouts):
+        node = _select(root, exploration)
+        _backpropagate(node, _rollout(node.state, node.player, rng, tablebase))
+        rollouts += 1
+    return root.root_visits(), rollouts
+
+
+class MCTSMethod(Method):
+    """Class with Monte-Carlo tree search method for playing Kalah
+
+    Attributes:
+        _exploration: UCT exploration constant
+        _workers: number of worker processes (0 - number of CPUs)
+        _budget_workers: number of worker processes with a node budget when
+            _workers is 0, so the budget is split the same way on any machine
+        _parallel_mode: NoParallel, RootParallel or TreeParallel; with a node
+            budget the moves are reproducible in all the modes (the workers
+            of RootParallel share the budget, the results of TreeParallel
+            are propagated in the order of the rollouts)
+        _time_share: part of the run time limit used for searching
+        _parallel_time_share: the same in the parallel modes; the rest is
+            left for the workers' last rollouts and collecting their results
+        _pool: multiprocessing.Pool of the worker processes; it's started on
+            the first parallel move and kept until game_over
+        _pool_workers: number of the worker processes of _pool
+        _rollouts: number of rollouts made during the last move
+        _rollouts_per_second: speed of the last move's search
+        _use_tablebase: if True then the rollouts are stopped in the endgame
+            tablebase positions (if its file exists; refer to tablebase.py)
+        Please refer to method.py for other details
+    """
+    _name = "Monte-Carlo tree search"
+    _short_name = "MCTS"
+    _disabled = False
+    _exploration = sqrt(2)
+    _workers = 1
+    _budget_workers = 2
+    _parallel_mode = NoParallel
+    _time_share = 1.0
+    _parallel_time_share = 0.9
+    _pool = None
+    _pool_workers = 0
+    _rollouts = 0
+    _rollouts_per_second = 0
+    _use_tablebase = True
+    _tablebase_file = None
+
+    def set_workers(self, workers):
+        """Sets number of worker processes (0 - number of CPUs)"""
+        self._workers = workers
+
+    def set_parallel_mode(self, parallel_mode):
+        """Sets parallel mode (NoParallel, RootParallel or TreeParallel)"""
+        self._parallel_mode = parallel_mode
+
+    def __getstate__(self):
+        """The pool is not sent to the processes with the instance"""
+        state = self.__dict__.copy()
+        state.pop('_pool', None)
+        state.pop('_pool_workers', None)
+        return state
+
+    def _worker_pool(self, workers):
+        """Returns the pool of the worker processes; it's started on the first
+        call, so the processes are paid once per game, not once per move"""
+        if self._pool and self._pool_workers != workers:
+            self._close_pool()
+        if not self._pool:
+            self._pool = Pool(workers)
+            self._pool_workers = workers
+        return self._pool
+
+    def _close_pool(self):
+        """Stops the worker processes"""
+        if self._pool:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+            self._pool_workers = 0
+
+    def game_over(self):
+        """Stops the worker processes after the game"""
+        self._close_pool()
+
+    def _workers_num(self):
+        """Returns a real number of the worker processes"""
+        if not self._workers and self._node_limit:
+            return self._budget_workers
+        return self._workers or os.cpu_count() or 1
+
+    def _seed(self):
+        """Returns a seed of the rollouts; it's fixed with a node budget"""
+        return 0 if self._node_limit else int(time())
+
+    def _sequential_search(self, state, deadline):
+        visits, self._rollouts = _grow_tree(state, self._player, deadline, self._exploration, self._seed(),
+                                            self._tablebase_file, self._node_limit)
+        return visits
+
+    def _root_parallel_search(self, state, deadline, workers):
+        """Grows independent trees in the worker processes and merges them"""
+        seed = self._seed()
+        max_rollouts = self._node_limit and max(self._node_limit // workers, 1)
+        trees = self._worker_pool(workers).starmap(_grow_tree, [(state, self._player, deadline, self._exploration,
+                                                                 seed + worker, self._tablebase_file, max_rollouts)
+                                                                for worker in range(workers)])
+        visits = {}
+        self._rollouts = 0
+        for tree_visits, rollouts in trees:
+            for holes, count in tree_visits.items():
+                visits[holes] = visits.get(holes, 0) + count
+            self._rollouts += rollouts
+        return visits
+
+    def _tree_parallel_search(self, state, deadline, workers):
+        """Grows one tree and plays its leaves out in the worker processes
+
+        Every worker has two rollouts queued, so it doesn't wait while
+        the results are propagated in this process. The results are taken in
+        the order the rollouts were started, so the tree grows the same way
+        whatever the timing of the workers is.
+        """
+        root = _Node(state, self._player)
+        running = deque()
+        seed = self._seed()
+        started = 0
+        self._rollouts = 0
+        pool = self._worker_pool(workers)
+        while True:
+            while len(running) < 2*workers and time() < deadline and \
+                    (not self._node_limit or started < self._node_limit):
+                leaf = _select(root, self._exploration)
+                seed += 1
+                running.append((leaf, pool.apply_async(_rollout_task, (leaf.state, leaf.player, seed,
+                                                                       self._tablebase_file))))
+                started += 1
+            if not running:
+                break
+            leaf, result = running.popleft()
+            _backpropagate(leaf, result.get())
+            self._rollouts += 1
+        return root.root_visits()
+
+    def make_move(self, state):
+        """Makes a decision of the player's next move
+
+        Args:
+            state: current board state
+
+        Returns:
+            Player's hole number which defines a player's next move
+        """
+        super(MCTSMethod, self).make_move(state)
+        start_time = time()
+        workers = self._workers_num()
+        parallel = workers > 1 and self._parallel_mode in (RootParallel, TreeParallel)
+        deadline = start_time + self._run_time_limit*(self._parallel_time_share if parallel else self._time_share)
+        if self._node_limit:
+            deadline = float('inf')
+
+        neighbors = state.get_all_neighbors(self._player)
+        if not neighbors:
+            return -1
+        if len(neighbors) == 1:
+            return neighbors[0]['hole'][0]
+
+        state = state.copy()
+        self._tablebase_file = self._use_tablebase and tablebase_path(state.holes_num()) or None
+        if parallel and self._parallel_mode == RootParallel:
+            visits = self._root_parallel_search(state, deadline, workers)
+        elif parallel:
+            visits = self._tree_parallel_search(state, deadline, workers)
+        else:
+            visits = self._sequential_search(state, deadline)
+        self._rollouts_per_second = self._rollouts / max(time() - start_time, 1e-9)
+        self._statistics.nodes = self._rollouts
+
+        if not visits:
+            return neighbors[0]['hole'][0]
+        return max(visits, key=visits.get)[0]
+
+
+class RootParallelMCTSMethod(MCTSMethod):
+    """MCTS with independent trees in two worker processes
+
+    The harness already plays several games at once and ponders, so the
+    method doesn't take all CPUs by default (set_workers(0) does that).
+    """
+    _name = "Monte-Carlo tree search (root-parallel)"
+    _short_name = "MCTS-root"
+    _workers = 2
+    _parallel_mode = RootParallel
+
+
+class TreeParallelMCTSMethod(MCTSMethod):
+    """MCTS with one tree and rollouts in two worker processes (refer to
+    RootParallelMCTSMethod)"""
+    _name = "Monte-Carlo tree search (tree-parallel)"
+    _short_name = "MCTS-tree"
+    _workers = 2
+    _parallel_mode = TreeParallel
+
+
+#
+# Measures rollouts per second for different numbers of the worker processes.
+# Run from the project's root folder: python -m methods.mcts
+#
+if __name__ == "__main__":
+    state = st.KalahState(4)
+    for parallel_mode in [RootParallel, TreeParallel]:
+        for workers in sorted(set([1, 2, 4, os.cpu_count() or 1])):
+            method = MCTSMethod(0, run_time_limit=5)
+            method.set_workers(workers)
+            method.set_parallel_mode(parallel_mode)
+            hole = method.make_move(state)
+            print("%s, %d workers: %d rollouts/sec, move %d" % (parallel_mode, workers, method._rollouts_per_second, hole))
+            method.game_over()
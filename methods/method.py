@@ -39,6 +39,161 @@ class Timer:
         """time_limit in seconds"""
         return time() - self._start_time > time_limit
 
+    def elapsed(self):
+        """Returns seconds since the start"""
+        return time() - self._start_time
+
+
+class TimeManager(object):
+    """
+    Decides how long to think about one move of the iterative deepening
+    
+    The hard limit stops the search at once (it's checked by the search 
+    itself), the soft limit only stops starting new iterations. The soft 
+    limit depends on the position: a forced move gets no time, a position 
+    with many moves (counting the chains of extra turns, refer to 
+    KalahState.get_all_neighbors) gets more than a quiet one. Then it 
+    follows the search: when the best move changes the soft limit grows, 
+    when the best move has been the same for several iterations the search 
+    stops earlier.
+    
+    Attributes:
+        _timer: Timer started at the beginning of the move
+        _soft_limit: seconds after which no new iteration is started
+        _hard_limit: seconds after which the search is stopped
+        _best_move: best move of the last finished iteration
+        _stable_iterations: number of the last iterations that didn't change
+            the best move
+    """
+    _timer = None
+    _soft_limit = 0
+    _hard_limit = 0
+    _best_move = None
+    _stable_iterations = 0
+    # Part of the run time limit a position with holes_num moves gets
+    SoftShare = 0.3
+    # Limits of the soft limit's scaling by the number of moves
+    MinScale = 0.5
+    MaxScale = 2.0
+    # The soft limit is multiplied by it when the best move changes
+    InstabilityFactor = 1.5
+    # After this number of iterations with the same best move...
+    StableIterations = 3
+    # ...the soft limit is multiplied by this
+    StabilityFactor = 0.5
+    
+    def __init__(self, timer, run_time_limit, hard_limit, moves_num, holes_num=6):
+        """
+        Inits a time manager of one move
+        
+        Args:
+            timer: Timer started at the beginning of the move
+            run_time_limit: run time limit of the move in seconds
+            hard_limit: seconds after which the search is stopped
+            moves_num: number of the moves in the position (including the 
+                chains of extra turns)
+            holes_num: number of holes of each player
+        """
+        self._timer = timer
+        self._hard_limit = hard_limit
+        scale = min(max(moves_num / float(holes_num), self.MinScale), self.MaxScale)
+        self._soft_limit = 0 if moves_num <= 1 else min(run_time_limit*self.SoftShare*scale, hard_limit)
+        
+    def soft_limit(self):
+        """Returns seconds after which no new iteration is started"""
+        return self._soft_limit
+        
+    def hard_limit(self):
+        """Returns seconds after which the search is stopped"""
+        return self._hard_limit
+        
+    def next_iteration(self, best_move):
+        """
+        Registers the best move of a finished iteration
+        
+        Returns:
+            True if the next iteration should be started
+        """
+        if best_move == self._best_move:
+            self._stable_iterations += 1
+        else:
+            if self._best_move is not None:
+                self._soft_limit = min(self._soft_limit*self.InstabilityFactor, self._hard_limit)
+            self._best_move = best_move
+            self._stable_iterations = 0
+        limit = self._soft_limit
+        if self._stable_iterations >= self.StableIterations:
+            limit *= self.StabilityFactor
+        return not self._timer.hasExpired(limit)
+
+
+class SearchStatistics(object):
+    """
+    Statistics of the search of one move
+    
+    Search methods fill it during make_move (refer to Method.statistics).
+    
+    Attributes:
+        nodes: number of searched nodes (what a node is depends on the method:
+            positions, rollouts, etc.)
+        time: seconds spent on the move
+        depth: depth that was reached (0 if the method has no depth)
+        cutoffs: list of the numbers of cutoffs by the index of the move that
+            caused them (0 - the first searched move)
+        table_probes: number of the transposition table lookups
+        table_hits: number of the lookups that found an entry
+        fail_highs: number of the re-searches after the value was above
+            the aspiration window
+        fail_lows: number of the re-searches after the value was below
+            the aspiration window
+        generation_time: seconds spent on the move generation
+        evaluation_time: seconds spent on the evaluation of the leaves
+    """
+    nodes = 0
+    time = 0.0
+    depth = 0
+    cutoffs = None
+    table_probes = 0
+    table_hits = 0
+    fail_highs = 0
+    fail_lows = 0
+    generation_time = 0.0
+    evaluation_time = 0.0
+    
+    def __init__(self):
+        self.cutoffs = []
+        
+    def add_cutoff(self, index):
+        """Counts a cutoff caused by the move with the index"""
+        while len(self.cutoffs) <= index:
+            self.cutoffs.append(0)
+        self.cutoffs[index] += 1
+        
+    def nodes_per_second(self):
+        """Returns the search speed"""
+        return self.nodes / self.time if self.time else 0.0
+        
+    def branching_factor(self):
+        """Returns the effective branching factor: nodes ** (1 / depth)"""
+        if not self.depth or not self.nodes:
+            return 0.0
+        return self.nodes ** (1.0 / self.depth)
+        
+    def to_string(self):
+        """Returns statistics in one line"""
+        text = "nodes %d, %.0f nodes/s, time %.2f s" % (self.nodes, self.nodes_per_second(), self.time)
+        if self.depth:
+            text += ", depth %d, branching factor %.2f" % (self.depth, self.branching_factor())
+        if self.cutoffs:
+            text += ", cutoffs by move %s" % ("/".join(str(cutoffs) for cutoffs in self.cutoffs),)
+        if self.table_probes:
+            text += ", table hits %d of %d" % (self.table_hits, self.table_probes)
+        if self.fail_highs or self.fail_lows:
+            text += ", re-searches %d high/%d low" % (self.fail_highs, self.fail_lows)
+        if self.generation_time or self.evaluation_time:
+            text += ", generation %.2f s, evaluation %.2f s" % (self.generation_time, self.evaluation_time)
+        return text
+
 
 class Method(object):
     """
@@ -49,20 +204,25 @@ class Method(object):
         _short_name: shorter title 
         _run_time_limit: amount of seconds that method can run; if the method
             will run out of time then its player will loose the game
+        _node_limit: node budget of one move (0 - no budget); search methods
+            stop on it instead of the run time limit
         _player: player' ID which uses this method (0 or 1)
         _disabled: if True then method will not be active in GUI
         _ai_level: level of the AI experience (from 1 to 5)
         _running_timer: QElapsedTimer object that is used to check if the 
             method has run out of the time limit
+        _statistics: SearchStatistics of the last move
     """
     
     _name = "Unknown"
     _short_name = "Unknown"
     _run_time_limit = 60
+    _node_limit = 0
     _player = 1
     _disabled = True
     _ai_level = 1
     _running_timer = None
+    _statistics = None
     
     def __init__(self, player_num, ai_level=1, run_time_limit=60):
         """
@@ -94,10 +254,39 @@ class Method(object):
         """Sets running time limit"""
         self._run_time_limit = run_time_limit
         
+    def set_node_limit(self, node_limit):
+        """
+        Sets a node budget of one move (0 - no budget)
+        
+        With the budget the search methods stop after the same amount of 
+        work on any machine and under any load, so their moves are 
+        reproducible. What a node is depends on the method (searched 
+        positions, rollouts, etc.). The run time limit is still checked by 
+        the game harness.
+        """
+        self._node_limit = node_limit
+        
+    def node_limit(self):
+        """Returns a node budget of one move (0 - no budget)"""
+        return self._node_limit
+        
+    def set_workers(self, workers):
+        """
+        Sets number of worker processes of one move (0 - number of CPUs)
+        
+        Only the parallel methods have workers (refer to mcts.py), the 
+        others ignore it.
+        """
+        pass
+        
     def set_player(self, player_num):
         """Sets a player number (0 or 1)"""
         self._player = player_num
         
+    def player(self):
+        """Returns a player number (0 or 1)"""
+        return self._player
+        
     def is_time_expired(self, time_limit=-1):
         """
         Checks if the method is running out of time limit
@@ -130,7 +319,47 @@ class Method(object):
         """
         self._running_timer = Timer()
         self._running_timer.start()
+        self._statistics = SearchStatistics()
         return -1
+    
+    def statistics(self):
+        """
+        Returns statistics of the last move (SearchStatistics) or None
+        
+        It should be called right after make_move: if the method didn't set 
+        the time then the time since the start of make_move is taken.
+        """
+        if self._statistics and not self._statistics.time and self._running_timer:
+            self._statistics.time = self._running_timer.elapsed()
+        return self._statistics
+    
+    def ponder(self, state, player, is_stopped):
+        """
+        Thinks during the opponent's turn (abstract)
+        
+        It is called after the method made its move when the method's 
+        instance is kept alive for the whole game (refer to 
+        student_gamer.AsyncEngineProcess). A method may search the state 
+        and keep the results for the next make_move call. It must return 
+        as soon as is_stopped() returns True, i.e. when the next move is
+        requested.
+        
+        Args:
+            state: board state after the method's move
+            player: player's number who moves in the state (0 or 1)
+            is_stopped: function without arguments that returns True when 
+                pondering should be finished
+        """
+        pass
+    
+    def game_over(self):
+        """
+        Is called when the game is finished (abstract)
+        
+        Like ponder it's called only when the method's instance is kept alive 
+        for the whole game. A method may store what it has learnt.
+        """
+        pass
 
 
 def raiseNotDefined():
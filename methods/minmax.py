@@ -86,8 +86,10 @@ along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 if __name__ == "__main__":
     from method import Method, raiseNotDefined
+    from tablebase import load_tablebase, tablebase_path
 else:
     from methods.method import Method, raiseNotDefined
+    from methods.tablebase import load_tablebase, tablebase_path
 
 
 class MinMaxMethod(Method):
@@ -105,11 +107,16 @@ class MinMaxMethod(Method):
         In the code below we call this player - Max, an opponent - Min.
     
     Attributes:
-        Please refer to method.py for details    
+        _use_tablebase: if True then the endgame tablebase is used (if its
+            file exists; refer to tablebase.py)
+        _tablebase: opened tablebase or None
+        Please refer to method.py for other details    
     """
     _name = "Min-max"
     _short_name = "Min-max"
     _disabled = False
+    _use_tablebase = True
+    _tablebase = None
     
     def __init__(self, player_num, ai_level=1, run_time_limit=60):
         """Inits MinMaxMethod object
@@ -178,6 +185,28 @@ class MinMaxMethod(Method):
 
         raiseNotDefined()
     
+    def _exact_value(self, state, player):
+        """Returns an exact value of the state from the endgame tablebase
+        
+        The value is a final difference between player MAX kalah and player
+        MIN kalah, so it's in the same units as the simple heuristics of 
+        _utility.
+        
+        Args:
+            state: state to check
+            player: active player's number for the specified state
+        Returns:
+            Exact value or None if the state is not in the tablebase
+        """
+        if not self._tablebase:
+            return None
+        value = self._tablebase.probe(state, player)
+        if value is None:
+            return None
+        if player != self._player:
+            value = -value
+        return state.player_kalah(self._player) - state.player_kalah(self._other_player()) + value
+    
     def _max_value(self, state, depth=1):
         """Part of Minimax algorithm for the MAX player
         
@@ -193,6 +222,14 @@ class MinMaxMethod(Method):
             all neighbors.
         """
         
+        #
+        # If the state is in the endgame tablebase then its exact value is 
+        # known and there is no need to expand it.
+        #
+        value = self._exact_value(state, self._player)
+        if value is not None:
+            return value
+        
         #
         # If the state is terminal then we should stop expanding the searching
         # tree from it. Return the utility of the current state in this case.
@@ -230,6 +267,14 @@ class MinMaxMethod(Method):
             all neighbors.
         """
         
+        #
+        # If the state is in the endgame tablebase then its exact value is 
+        # known and there is no need to expand it.
+        #
+        value = self._exact_value(state, self._other_player())
+        if value is not None:
+            return value
+        
         #
         # If the state is terminal then we should stop expanding the searching
         # tree from it. Return the utility of the current state in this case.
@@ -269,6 +314,8 @@ class MinMaxMethod(Method):
         """
         super(MinMaxMethod, self).make_move(state)
         # print("AI Level: ", self._ai_level)
+        if self._use_tablebase:
+            self._tablebase = load_tablebase(tablebase_path(state.holes_num()))
         
         #
         # Generate all possible neighbors for the state, i.e. check all 
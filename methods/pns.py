@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+"""Proof-number search for Kalah endgames.
+
+An alpha-beta search looks for the best value; often it's enough to know
+whether the player who moves wins (or at least doesn't lose) with perfect
+play. Such a yes/no question is answered much faster by the depth-first
+proof-number search (df-pn):
+
+    - every node has a proof number (how many leaves must still be proven to
+      prove the node) and a disproof number (the same to disprove it);
+    - the search always goes into the most proving child, i.e. where the
+      question is decided with the least work, and comes back when the
+      numbers exceed the thresholds given by the parent.
+
+A question is "can the player who moves add at least target stones more than
+the opponent to the kalahs from now on?" (the same units as the values of
+AlphaBetaMethod and the tablebase). A position is keyed by the holes as seen
+by the player who moves (refer to state.canonical_pits), so the search always
+moves for player 0. After an opponent's move the question is turned around:
+the player reaches the target if the opponent doesn't reach gain - target + 1,
+where gain is what the player added by the move. Kalah has no cycles (refer
+to tablebase.py), so df-pn doesn't need any special treatment of them.
+
+The table is bounded: when it's full the decided nodes are kept and only the
+half of the others that took the most work (searched nodes in their subtrees)
+survives.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+
+import sys
+
+# Proof and disproof numbers of decided nodes
+Infinity = 10**9
+
+#
+# Results of a game
+#
+Win = 1
+Draw = 0
+Loss = -1
+
+
+class ProofSearchStopped(Exception):
+    """Raised when the proof-number search runs out of nodes or time"""
+    pass
+
+
+class ProofNumberSearch(object):
+    """Class that proves or disproves the results of Kalah positions
+
+    Attributes:
+        _holes_num: number of holes of each player
+        _table: dictionary with (canonical pits, target) keys and (proof
+            number, disproof number, work) values
+        _max_table_size: maximum number of entries in the table
+        _tablebase: Tablebase object or None
+        _nodes: number of searched nodes during the last proof
+        _max_nodes: node budget of the last proof (0 - no budget)
+        _is_stopped: function without arguments that returns True when the
+            proof should be stopped, or None
+    """
+    _holes_num = 6
+    _table = None
+    _max_table_size = 200000
+    _tablebase = None
+    _nodes = 0
+    _max_nodes = 0
+    _is_stopped = None
+
+    def __init__(self, holes_num, max_table_size=200000, tablebase=None):
+        """Inits a search
+
+        Args:
+            holes_num: number of holes of each player
+            max_table_size: maximum number of entries in the table
+            tablebase: Tablebase object for the exact values of the endgame
+                positions or None
+        """
+        self._holes_num = holes_num
+        self._max_table_size = max_table_size
+        self._tablebase = tablebase
+        self._table = {}
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    def nodes(self):
+        """Returns number of searched nodes during the last proof or result"""
+        return self._nodes
+
+    def _decided(self, pits, target):
+        """Returns numbers of a node that is decided without search or None"""
+        stones = sum(pits)
+        # the player gets at least -stones and at most stones
+        if target <= -stones:
+            return 0, Infinity
+        if target > stones or not any(pits[:self._holes_num]):
+            return Infinity, 0
+        if self._tablebase:
+            value = self._tablebase.probe_pits(pits, 0)
+            if value is not None:
+                return (0, Infinity) if value >= target else (Infinity, 0)
+        return None
+
+    def _numbers(self, pits, target):
+        """Returns (proof number, disproof number) of a node"""
+        key = (pits, target)
+        entry = self._table.get(key)
+        if entry is not None:
+            return entry[:2]
+        numbers = self._decided(pits, target)
+        if numbers is None:
+            return 1, 1
+        self._store(key, numbers, 0)
+        return numbers
+
+    def _store(self, key, numbers, work):
+        """Stores numbers of a node; the table is cleaned up when it's full"""
+        if len(self._table) >= self._max_table_size:
+            decided = [item for item in self._table.items() if not item[1][0] or not item[1][1]]
+            undecided = [item for item in self._table.items() if item[1][0] and item[1][1]]
+            undecided.sort(key=lambda item: item[1][2], reverse=True)
+            self._table = dict(decided + undecided[:max(0, self._max_table_size // 2 - len(decided))])
+        self._table[key] = numbers + (work,)
+
+    def _children(self, pits, target):
+        """Returns a list of (hole, pits, target, same_player) for the moves"""
+        holes_num = self._holes_num
+        children = []
+        for hole in range(holes_num):
+            if pits[hole]:
+                new_pits, gain, result = st.sow(pits, holes_num, 0, hole)
+                if result == st.MoveEndsInPlayersKalah:
+                    children.append((hole, new_pits, target - gain, True))
+                else:
+                    children.append((hole, st.canonical_pits(new_pits, holes_num, 1), gain - target + 1, False))
+        return children
+
+    def _child_numbers(self, child):
+        """Returns numbers of a child as seen by the parent's player"""
+        hole, pits, target, same_player = child
+        proof, disproof = self._numbers(pits, target)
+        return (proof, disproof) if same_player else (disproof, proof)
+
+    def _mid(self, pits, target, max_proof, max_disproof):
+        """Searches a node until its numbers reach the thresholds"""
+        self._nodes += 1
+        start_nodes = self._nodes
+        if not self._nodes % 1000 and self._is_stopped and self._is_stopped() or \
+                self._max_nodes and self._nodes > self._max_nodes:
+            raise ProofSearchStopped()
+
+        children = self._children(pits, target)
+        while True:
+            proof, disproof = Infinity, 0
+            best, best_disproof, second_proof = None, 0, Infinity
+            for child in children:
+                child_proof, child_disproof = self._child_numbers(child)
+                disproof = min(disproof + child_disproof, Infinity)
+                if child_proof < proof:
+                    second_proof = proof
+                    proof, best, best_disproof = child_proof, child, child_disproof
+                elif child_proof < second_proof:
+                    second_proof = child_proof
+            if proof >= max_proof or disproof >= max_disproof:
+                self._store((pits, target), (proof, disproof), self._nodes - start_nodes + 1)
+                return proof, disproof
+
+            child_max_proof = min(max_proof, second_proof + 1)
+            child_max_disproof = max_disproof - disproof + best_disproof
+            hole, child_pits, child_target, same_player = best
+            if same_player:
+                self._mid(child_pits, child_target, child_max_proof, child_max_disproof)
+            else:
+                self._mid(child_pits, child_target, child_max_disproof, child_max_proof)
+
+    def prove(self, pits, player, target, max_nodes=0, is_stopped=None):
+        """Checks if the player can add at least target stones more than the
+        opponent to the kalahs from now on
+
+        Args:
+            pits: tuple of the holes' contents (refer to KalahState.get_pits)
+            player: player who moves
+            target: difference of stones to reach
+            max_nodes: node budget (0 - no budget)
+            is_stopped: function without arguments that returns True when the
+                search should be stopped
+
+        Returns:
+            True if it's proven, False if it's disproven, None if the search
+            was stopped
+        """
+        pits = st.canonical_pits(pits, self._holes_num, player)
+        self._nodes = 0
+        self._max_nodes = max_nodes
+        self._is_stopped = is_stopped
+        try:
+            proof, disproof = self._numbers(pits, target)
+            if proof and disproof:
+                proof, disproof = self._mid(pits, target, Infinity, Infinity)
+        except ProofSearchStopped:
+            return None
+        finally:
+            self._is_stopped = None
+        return not proof
+
+    def proving_move(self, pits, player, target):
+        """Returns a hole that keeps a proven target or None"""
+        pits = st.canonical_pits(pits, self._holes_num, player)
+        for child in self._children(pits, target):
+            if not self._child_numbers(child)[0]:
+                return child[0]
+        return None
+
+    def result(self, state, player, max_nodes=0, is_stopped=None):
+        """Proves the result of the game with perfect play
+
+        Args:
+            state: KalahState object
+            player: player who moves
+            Please refer to prove for other details
+
+        Returns:
+            A tuple of the result for the player (Win, Draw, Loss or None if
+            it's not proven) and the hole that keeps a won or drawn game
+        """
+        pits = state.get_pits()
+        difference = state.player_kalah(player) - state.player_kalah(1 - player)
+        win = self.prove(pits, player, 1 - difference, max_nodes, is_stopped)
+        nodes = self._nodes
+        if win:
+            return Win, self.proving_move(pits, player, 1 - difference)
+        if win is None:
+            return None, None
+        draw = self.prove(pits, player, -difference, max_nodes and max(1, max_nodes - nodes), is_stopped)
+        self._nodes += nodes
+        if draw:
+            return Draw, self.proving_move(pits, player, -difference)
+        if draw is None:
+            return None, None
+        return Loss, None
+
+
+#
+# Proves the result of a position. Run from the project's root folder:
+#     python -m methods.pns
+#
+if __name__ == "__main__":
+    state = st.KalahState(0, 6)
+    state._holes = [[0, 2, 1, 3, 0, 4], [1, 0, 3, 2, 2, 1]]
+    state._kalahs = [20, 21]
+    search = ProofNumberSearch(6)
+    print(search.result(state, 0), "nodes", search.nodes())
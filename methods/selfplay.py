@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""Self-play games for training of the evaluation functions.
+
+The games are played by AlphaBetaMethod with a small fixed depth; some moves
+are random so the games don't repeat each other. Every position of a game is
+labelled with its result: the difference between the stones that the player
+who moves and the opponent added to their kalahs from that position till the
+end of the game (the same units as the values of AlphaBetaMethod and the
+endgame tablebase). The difference between their kalahs in the position is
+kept as well, so the final result of the game can be restored.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+
+from random import Random
+from multiprocessing import Pool
+
+
+def label_positions(records, final_kalahs):
+    """Labels positions of a game with its result
+
+    Args:
+        records: list of (state, player) for each position of the game
+        final_kalahs: kalahs of the both players after the game is finished
+
+    Returns:
+        A list of (pits, player, value, kalahs_difference) tuples, where
+        value is what the player who moves will get more than the opponent
+        till the end of the game and kalahs_difference is the difference
+        between their kalahs in the position
+    """
+    positions = []
+    for state, player in records:
+        final = final_kalahs[player] - final_kalahs[1 - player]
+        current = state.player_kalah(player) - state.player_kalah(1 - player)
+        positions.append((state.get_pits(), player, final - current, current))
+    return positions
+
+
+def play_game(stones, holes_num=6, depth=3, randomness=0.1, seed=None):
+    """Plays one self-play game
+
+    Args:
+        stones: number of stones in each hole on game startup
+        holes_num: number of holes of each player
+        depth: search depth of the players
+        randomness: probability of a random move
+        seed: seed of the random moves
+
+    Returns:
+        A list of (pits, player, value, kalahs_difference) tuples (refer to
+        label_positions)
+    """
+    from methods.alphabeta import AlphaBetaMethod
+    rng = Random(seed)
+    players = []
+    for player in [0, 1]:
+        method = AlphaBetaMethod(player, run_time_limit=float('inf'))
+        method.set_max_depth(depth)
+        method._use_book = method._use_cache = False
+        players.append(method)
+
+    state = st.KalahState(stones, holes_num)
+    player = 0
+    records = []
+    while not state.is_finished(player):
+        records.append((state.copy(), player))
+        if rng.random() < randomness:
+            holes = state.player_holes(player)
+            hole = rng.choice([hole for hole in range(holes_num) if holes[hole]])
+        else:
+            hole = players[player].make_move(state)
+        if state.move(player, hole, record=False) != st.MoveEndsInPlayersKalah:
+            player = (player + 1) % 2
+    return label_positions(records, state.end_game())
+
+
+def _play_game_task(args):
+    return play_game(*args)
+
+
+def self_play_positions(games, stones_list=(3, 4, 5, 6), holes_num=6, depth=3, randomness=0.1,
+                        processes=None, seed=0):
+    """Plays games in a process pool and returns all their positions
+
+    Args:
+        games: number of games
+        stones_list: numbers of stones in each hole on game startup (the
+            games are spread evenly among them)
+        processes: size of the process pool (default: number of CPUs)
+        Please refer to play_game for other details
+
+    Returns:
+        A list of (pits, player, value, kalahs_difference) tuples
+    """
+    tasks = [(stones_list[game % len(stones_list)], holes_num, depth, randomness, seed + game)
+             for game in range(games)]
+    positions = []
+    with Pool(processes) as pool:
+        for game_positions in pool.imap_unordered(_play_game_task, tasks):
+            positions += game_positions
+    return positions
@@ -0,0 +1,377 @@
+#!/usr/bin/env python
+"""Exact solver of small Kalah configurations.
+
+A game with a few stones per hole (e.g. 6 holes with 3 stones) can be solved
+outright: the solver proves the exact value of the initial position (the
+difference between the stones the first player and the opponent will add to
+their kalahs with perfect play) and the best move of each proven position.
+
+The search is a depth-first alpha-beta without a depth limit on the compact
+board (refer to state.sow) with MTD(f) on top of it: the value is narrowed
+with null-window searches, each of them only proves that the value is not
+less (or not greater) than a guess. The transposition table keeps the proven
+lower and upper bounds of each position, so the next searches reuse them. It
+is keyed by the holes as seen by the player who moves (refer to
+state.canonical_pits), so the search itself always moves for player 0.
+Endgame positions are taken from the tablebase if it exists.
+
+Every bound in the table is true whenever it was written, so the table can be
+saved at any moment. The solver saves it every checkpoint_interval seconds
+and the next run continues from the saved table.
+
+SolverMethod plays the solved games: a move of a proven position is taken
+from the table without searching. Positions that are not proven in time are
+played by AlphaBetaMethod.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from methods.alphabeta import AlphaBetaMethod, SearchTimeout
+from methods.method import Method
+from methods.tablebase import load_tablebase, tablebase_path
+import state as st
+
+import os
+import sys
+import time
+import pickle
+
+SolutionFolder = 'solutions'
+FileMagic = b'KALAHSV2'
+
+
+def solution_path(holes_num, stones, folder=SolutionFolder):
+    """Returns a default file name of the solution of the game with stones in
+    each hole on startup"""
+    return os.path.join(folder, 'kalah-%d-%d.sol' % (holes_num, stones))
+
+
+class Solver(object):
+    """Class that proves values of positions and keeps the proofs
+
+    Attributes:
+        _holes_num: number of holes of each player
+        _table: dictionary with canonical pits keys and (lower, upper, hole)
+            values: the proven bounds of the position's value and the move
+            that gets at least the lower bound
+        _tablebase: Tablebase object or None
+        _path: file name of the checkpoints or None
+        _checkpoint_interval: seconds between the checkpoints
+        _last_checkpoint: time of the last checkpoint
+        _is_stopped: function without arguments that returns True when the
+            search should be stopped, or None
+        _nodes: number of searched nodes
+    """
+    _holes_num = 6
+    _table = None
+    _tablebase = None
+    _path = None
+    _checkpoint_interval = 600
+    _last_checkpoint = 0
+    _is_stopped = None
+    _nodes = 0
+
+    def __init__(self, holes_num, path=None, checkpoint_interval=600, use_tablebase=True):
+        """Inits a solver; the table is loaded from the path if it exists
+
+        Args:
+            holes_num: number of holes of each player
+            path: file name of the checkpoints (None - no checkpoints)
+            checkpoint_interval: seconds between the checkpoints
+            use_tablebase: if True then the endgame tablebase is used (if its
+                file exists)
+        """
+        self._holes_num = holes_num
+        self._path = path
+        self._checkpoint_interval = checkpoint_interval
+        self._last_checkpoint = time.time()
+        self._table = {}
+        if use_tablebase:
+            self._tablebase = load_tablebase(tablebase_path(holes_num))
+        if path and os.path.exists(path):
+            self.load(path)
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+    def load(self, path):
+        """Loads the table from a file without making it the checkpoints' file"""
+        with open(path, 'rb') as f:
+            data = pickle.load(f)
+        if data.get('magic') != FileMagic or data.get('holes_num') != self._holes_num:
+            raise ValueError("%s is not a solution file for %d holes" % (path, self._holes_num))
+        self._table = data['table']
+
+    def size(self):
+        """Returns number of positions in the table"""
+        return len(self._table)
+
+    def nodes(self):
+        """Returns number of searched nodes"""
+        return self._nodes
+
+    def save(self, path=None):
+        """Saves the table to the file (the checkpoints' file by default)
+
+        The file is replaced at once, so an interrupted saving doesn't spoil
+        the previous checkpoint.
+        """
+        path = path or self._path
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        with open(path + '.tmp', 'wb') as f:
+            pickle.dump({'magic': FileMagic, 'holes_num': self._holes_num, 'table': self._table}, f,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(path + '.tmp', path)
+        self._last_checkpoint = time.time()
+
+    def proven(self, pits, player):
+        """Returns a tuple of the exact value and the best hole of a proven
+        position or None"""
+        entry = self._table.get(st.canonical_pits(pits, self._holes_num, player))
+        if entry and entry[0] == entry[1]:
+            return entry[0], entry[2]
+        return None
+
+    def _check(self):
+        """Stops the search or saves a checkpoint if it's time to"""
+        if self._is_stopped and self._is_stopped():
+            raise SearchTimeout()
+        if self._path and time.time() - self._last_checkpoint > self._checkpoint_interval:
+            self.save()
+
+    def _search(self, pits, stones, alpha, beta):
+        """Alpha-beta search till the end of the game
+
+        Args:
+            pits: canonical tuple of the holes' contents (the player who moves
+                is player 0)
+            stones: number of stones in the holes
+            alpha: the value the player already has somewhere above
+            beta: the value the opponent already has somewhere above
+
+        Returns:
+            Value of the position for the player. If it's not greater than
+            alpha then it's an upper bound of the real value, if it's not less
+            than beta then it's a lower bound.
+        """
+        self._nodes += 1
+        if not self._nodes % 100000:
+            self._check()
+
+        holes_num = self._holes_num
+        if not any(pits[:holes_num]):
+            return -stones
+        if self._tablebase:
+            value = self._tablebase.probe_pits(pits, 0)
+            if value is not None:
+                return value
+
+        lower, upper, first_hole = self._table.get(pits, (-stones, stones, None))
+        if lower >= beta:
+            return lower
+        if upper <= alpha or lower == upper:
+            return upper
+        alpha, beta = max(alpha, lower), min(beta, upper)
+
+        # the move from the table goes first, then the moves with an extra turn
+        moves = []
+        for hole in range(holes_num):
+            if pits[hole]:
+                new_pits, kalah_add, result = st.sow(pits, holes_num, 0, hole)
+                priority = 0 if hole == first_hole else 1 if result == st.MoveEndsInPlayersKalah else 2
+                moves.append((priority, hole, new_pits, kalah_add, result))
+        moves.sort()
+
+        original_alpha = alpha
+        best_value, best_hole = -stones - 1, first_hole
+        for priority, hole, new_pits, kalah_add, result in moves:
+            new_stones = stones - kalah_add
+            if result == st.MoveEndsInPlayersKalah:
+                value = kalah_add + self._search(new_pits, new_stones, alpha - kalah_add, beta - kalah_add)
+            else:
+                value = kalah_add - self._search(st.canonical_pits(new_pits, holes_num, 1), new_stones,
+                                                 kalah_add - beta, kalah_add - alpha)
+            if value > best_value:
+                best_value = value
+                if value > original_alpha:
+                    best_hole = hole
+            if value > alpha:
+                alpha = value
+            if alpha >= beta:
+                break
+
+        if best_value <= original_alpha:
+            upper = min(upper, best_value)
+        elif best_value >= beta:
+            lower = max(lower, best_value)
+        else:
+            lower = upper = best_value
+        self._table[pits] = (lower, upper, best_hole)
+        return best_value
+
+    def solve(self, pits, player, is_stopped=None):
+        """Proves the exact value of a position with MTD(f)
+
+        Args:
+            pits: tuple of the holes' contents (refer to KalahState.get_pits)
+            player: player who moves
+            is_stopped: function without arguments that returns True when the
+                search should be stopped; then SearchTimeout is raised
+
+        Returns:
+            A tuple of the exact value and the best hole (None if the game is
+            finished)
+        """
+        self._is_stopped = is_stopped
+        try:
+            pits = st.canonical_pits(pits, self._holes_num, player)
+            stones = sum(pits)
+            lower, upper, hole = self._table.get(pits, (-stones, stones, None))
+            guess = lower if lower > -stones else upper if upper < stones else 0
+            while lower < upper:
+                beta = guess + 1 if guess == lower else guess
+                guess = self._search(pits, stones, beta - 1, beta)
+                if guess < beta:
+                    upper = guess
+                else:
+                    lower = guess
+            entry = self._table.get(pits)
+            return lower, entry and entry[2]
+        finally:
+            self._is_stopped = None
+
+
+_solutions = {}
+
+
+def load_solution(path, holes_num):
+    """Returns a Solver with the table from the file or None if there's no
+    such file
+
+    The file is loaded once per process and the solver is kept for the later
+    calls. The file is read only: the games are played by many processes at
+    once, so only the solving run (refer to __main__) writes checkpoints.
+    """
+    if path not in _solutions:
+        try:
+            solver = None
+            if os.path.exists(path):
+                solver = Solver(holes_num)
+                solver.load(path)
+            _solutions[path] = solver
+        except (OSError, ValueError, KeyError, pickle.UnpicklingError):
+            _solutions[path] = None
+    return _solutions[path]
+
+
+class SolverMethod(AlphaBetaMethod):
+    """Class with the exact solver for playing Kalah
+
+    The moves are taken from the solution file of the game (refer to
+    solution_path). A position that is not proven in the file is solved
+    during _solver_time_share of the run time limit (or of the node budget),
+    then AlphaBetaMethod gets the rest of the time.
+
+    Attributes:
+        _solver_time_share: part of the run time limit used for solving
+        Please refer to alphabeta.py for other details
+    """
+    _name = "Exact solver"
+    _short_name = "Solver"
+    _disabled = False
+    _solver_time_share = 0.3
+
+    def _solution(self, state):
+        """Returns a Solver of the game or None"""
+        holes_num = state.holes_num()
+        total = sum(state.get_pits()) + state.player_kalah(0) + state.player_kalah(1)
+        if total % (2*holes_num):
+            return None
+        return load_solution(solution_path(holes_num, total // (2*holes_num)), holes_num)
+
+    def make_move(self, state):
+        """Makes a decision of the player's next move
+
+        Args:
+            state: current board state
+
+        Returns:
+            Player's hole number which defines a player's next move
+        """
+        solution = self._solution(state)
+        if solution:
+            Method.make_move(self, state)
+            start_nodes = solution.nodes()
+            if self._node_limit:
+                max_nodes = start_nodes + self._node_limit*self._solver_time_share
+                is_stopped = lambda: solution.nodes() >= max_nodes
+            else:
+                is_stopped = lambda: self.is_time_expired(self._run_time_limit*self._solver_time_share)
+            try:
+                value, hole = solution.solve(state.get_pits(), self._player, is_stopped)
+                if hole is not None:
+                    self._value = value
+                    self._statistics.nodes = solution.nodes() - start_nodes
+                    return hole
+            except SearchTimeout:
+                pass
+            run_time_limit = self._run_time_limit
+            self._run_time_limit = max(run_time_limit - self._running_timer.elapsed(), 0)
+            try:
+                return super(SolverMethod, self).make_move(state)
+            finally:
+                self._run_time_limit = run_time_limit
+        return super(SolverMethod, self).make_move(state)
+
+    def ponder(self, state, player, is_stopped):
+        """Solves the state until is_stopped() is True
+
+        Args:
+            Please refer to Method.ponder for details
+        """
+        solution = self._solution(state)
+        if not solution:
+            return super(SolverMethod, self).ponder(state, player, is_stopped)
+        try:
+            solution.solve(state.get_pits(), player, is_stopped)
+        except SearchTimeout:
+            pass
+
+
+#
+# Solves a game and saves the proofs. Run from the project's root folder:
+#     python -m methods.solver [holes_num] [stones] [checkpoint interval]
+# An interrupted run (Ctrl+C) saves a checkpoint; the next run continues it.
+#
+if __name__ == "__main__":
+    holes_num = len(sys.argv) > 1 and int(sys.argv[1]) or 6
+    stones = len(sys.argv) > 2 and int(sys.argv[2]) or 3
+    checkpoint_interval = len(sys.argv) > 3 and int(sys.argv[3]) or 600
+    path = solution_path(holes_num, stones)
+    solver = Solver(holes_num, path, checkpoint_interval)
+    print("%d positions loaded from %s" % (solver.size(), path))
+    start = time.time()
+    try:
+        value, hole = solver.solve(st.KalahState(stones, holes_num).get_pits(), 0)
+    except KeyboardInterrupt:
+        solver.save()
+        print("Interrupted: %d positions saved" % (solver.size(),))
+        sys.exit(1)
+    solver.save()
+    print("Value: %d, best hole: %d (%d nodes, %d positions, %.1f s)" %
+          (value, hole, solver.nodes(), solver.size(), time.time() - start))
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+"""Endgame tablebase for Kalah.
+
+When only a few stones are left on the board, the exact result of the game
+can be computed once and stored. This module contains a generator of such a
+tablebase and a class that reads it.
+
+The value of a position doesn't depend on the kalahs: whatever is already in
+the kalahs stays there. So a position is defined by the contents of the holes
+and the player who moves. Its value is the difference between the stones that
+the player and the opponent will still add to their kalahs if both of them
+play perfectly. A position with player 1 to move has the same value as its
+mirror with player 0 to move, so only the holes as seen by the player who
+moves are stored (refer to state.canonical_pits).
+
+The generator enumerates every position with up to max_stones stones in the
+holes and solves them level by level (by the number of stones on the board).
+A move never increases the number of stones on the board and a move that
+keeps it (no stone reaches the kalah) only moves the stones forward, so each
+level depends on the lower levels and on itself without cycles. Positions of
+one level are solved by a pool of processes, each of them has a copy of the
+lower levels.
+
+File format (little-endian):
+    header: 8 bytes of FileMagic, holes_num and max_stones as uint32
+    values: one signed byte per position; the position's index is computed by
+        position_index function
+
+Search methods open the file with mmap (refer to load_tablebase), so every
+endgame node becomes one lookup and the operating system shares the file's
+pages between the processes.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+
+import os
+import sys
+import mmap
+import struct
+from math import comb
+from multiprocessing import Pool
+
+FileMagic = b'KALAHTB2'
+HeaderFormat = '<8sII'
+HeaderSize = struct.calcsize(HeaderFormat)
+TablebaseFolder = 'tablebases'
+
+
+def tablebase_path(holes_num, folder=TablebaseFolder):
+    """Returns a default file name of the tablebase for holes_num"""
+    return os.path.join(folder, 'kalah-%d.tb' % holes_num)
+
+
+def positions_num(holes_num, max_stones):
+    """Returns number of positions with up to max_stones"""
+    return comb(max_stones + 2*holes_num, 2*holes_num)
+
+
+def position_index(pits, player, max_stones):
+    """Returns index of the position in the tablebase
+
+    Holes' contents as seen by the player who moves are ranked among all the
+    ways to place up to max_stones stones into the holes (lexicographically,
+    the last "hole" takes the stones that are not on the board).
+
+    Args:
+        pits: tuple of the holes' contents (refer to KalahState.get_pits)
+        player: player who moves
+        max_stones: maximum number of stones in the tablebase
+
+    Returns:
+        Index or -1 if there are more than max_stones stones on the board
+    """
+    parts = len(pits)
+    pits = st.canonical_pits(pits, parts // 2, player)
+    index = 0
+    stones = max_stones
+    for i in range(parts):
+        if pits[i] > stones:
+            return -1
+        if pits[i]:
+            rest = parts - i
+            index += comb(stones + rest, rest) - comb(stones - pits[i] + rest, rest)
+            stones -= pits[i]
+    return index
+
+
+def _compositions(stones, parts):
+    """Generates all the ways to place stones into parts holes"""
+    if parts == 1:
+        yield (stones,)
+        return
+    for first in range(stones, -1, -1):
+        for rest in _compositions(stones - first, parts - 1):
+            yield (first,) + rest
+
+
+class Tablebase(object):
+    """Class that reads a tablebase file
+
+    Attributes:
+        _holes_num: number of holes of each player
+        _max_stones: maximum number of stones on the board
+        _file: opened tablebase file
+        _map: memory map of the file
+    """
+    _holes_num = 6
+    _max_stones = 0
+    _file = None
+    _map = None
+
+    def __init__(self, path):
+        """Opens a tablebase file
+
+        Args:
+            path: file name
+        Raises:
+            ValueError if the file is not a tablebase
+        """
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._holes_num, self._max_stones = struct.unpack_from(HeaderFormat, self._map)
+        if magic != FileMagic or \
+                len(self._map) != HeaderSize + positions_num(self._holes_num, self._max_stones):
+            self.close()
+            raise ValueError("%s is not a Kalah tablebase" % path)
+
+    def holes_num(self):
+        """Returns number of holes"""
+        return self._holes_num
+
+    def max_stones(self):
+        """Returns maximum number of stones on the board"""
+        return self._max_stones
+
+    def probe_pits(self, pits, player):
+        """Returns value of the position given by pits or None if it's not
+        in the tablebase (refer to probe)"""
+        index = position_index(pits, player, self._max_stones)
+        if index < 0:
+            return None
+        value = self._map[HeaderSize + index]
+        return value - 256 if value > 127 else value
+
+    def probe(self, state, player):
+        """Returns exact value of the state
+
+        Args:
+            state: KalahState object
+            player: player who moves
+        Returns:
+            Difference between the stones that the player and the opponent
+            will add to their kalahs till the end of the game with perfect
+            play or None if the state is not in the tablebase
+        """
+        if state.holes_num() != self._holes_num:
+            return None
+        return self.probe_pits(state.get_pits(), player)
+
+    def close(self):
+        """Closes the file"""
+        if self._map:
+            self._map.close()
+            self._map = None
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+_tablebases = {}
+
+
+def load_tablebase(path):
+    """Returns a Tablebase for the file or None if there's no such file
+
+    The tablebase is opened once per process and is kept for the later calls
+    """
+    if path not in _tablebases:
+        try:
+            _tablebases[path] = Tablebase(path)
+        except (OSError, ValueError):
+            _tablebases[path] = None
+    return _tablebases[path]
+
+
+#
+# Generator. The functions below are run in the pool's processes.
+#
+_solved = None
+
+
+def _init_solver(holes_num, max_stones, solved):
+    global _solved
+    _solved = (holes_num, max_stones, solved)
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 100000))
+
+
+def _solve(pits, stones, memo):
+    """Solves a position with stones on the board
+
+    The pits are canonical, i.e. the player who moves is player 0. The lower
+    levels are taken from the solved table, the positions of the same level
+    are solved recursively and kept in memo.
+    """
+    holes_num, max_stones, solved = _solved
+    if not any(pits[:holes_num]):
+        return -stones
+    if pits in memo:
+        return memo[pits]
+
+    best = None
+    for hole in range(holes_num):
+        if not pits[hole]:
+            continue
+        new_pits, kalah_add, result = st.sow(pits, holes_num, 0, hole)
+        extra_turn = result == st.MoveEndsInPlayersKalah
+        if not extra_turn:
+            new_pits = st.canonical_pits(new_pits, holes_num, 1)
+        new_stones = stones - kalah_add
+        if new_stones < stones:
+            value = solved[position_index(new_pits, 0, max_stones)]
+            value = value - 256 if value > 127 else value
+        else:
+            value = _solve(new_pits, new_stones, memo)
+        value = kalah_add + (value if extra_turn else -value)
+        if best is None or value > best:
+            best = value
+    memo[pits] = best
+    return best
+
+
+def _solve_chunk(chunk):
+    """Solves a list of positions; returns a list of (index, value)"""
+    holes_num, max_stones, solved = _solved
+    memo = {}
+    result = []
+    for pits in chunk:
+        value = _solve(pits, sum(pits), memo)
+        result.append((position_index(pits, 0, max_stones), value))
+    return result
+
+
+def generate(path, holes_num=6, max_stones=12, processes=None, chunk_size=20000, be_silent=False):
+    """Generates a tablebase file
+
+    Args:
+        path: file name
+        holes_num: number of holes of each player
+        max_stones: maximum number of stones on the board (up to 127)
+        processes: size of the process pool (default: number of CPUs)
+        chunk_size: number of positions sent to a process at once
+        be_silent: if True then progress is not printed
+    """
+    count = positions_num(holes_num, max_stones)
+    solved = bytearray(count)
+    for stones in range(1, max_stones + 1):
+        positions = list(_compositions(stones, 2*holes_num))
+        chunks = [positions[i:i + chunk_size] for i in range(0, len(positions), chunk_size)]
+        with Pool(processes, initializer=_init_solver, initargs=(holes_num, max_stones, bytes(solved))) as pool:
+            for result in pool.imap_unordered(_solve_chunk, chunks):
+                for index, value in result:
+                    solved[index] = value & 0xFF
+        if not be_silent:
+            print("%d stones: %d positions solved" % (stones, len(positions)))
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'wb') as f:
+        f.write(struct.pack(HeaderFormat, FileMagic, holes_num, max_stones))
+        f.write(solved)
+
+
+#
+# Generates a tablebase. Run from the project's root folder:
+#     python -m methods.tablebase [holes_num] [max_stones] [processes]
+#
+if __name__ == "__main__":
+    holes_num = len(sys.argv) > 1 and int(sys.argv[1]) or 6
+    max_stones = len(sys.argv) > 2 and int(sys.argv[2]) or 12
+    processes = len(sys.argv) > 3 and int(sys.argv[3]) or None
+    generate(tablebase_path(holes_num), holes_num, max_stones, processes)
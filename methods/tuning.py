@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+"""Tuning of the evaluation weights for Kalah.
+
+AlphaBetaMethod._utility is a weighted sum of the differences between the
+evaluation features of the player and the opponent (refer to Feature*
+constants in state.py). This module fits the weights to the results of
+played games (Texel's method):
+
+    the probability that the player who moves wins is predicted as
+        sigmoid(scale * (kalahs_difference + weights . features_difference))
+    and the weights minimize the mean squared error between the prediction
+    and the real result (1 - win, 0.5 - draw, 0 - loss).
+
+The positions are taken from the game protocols in game_logs (written by
+student_gamer.py) and from self-play games (refer to selfplay.py). All of them
+are loaded into NumPy arrays: the features are computed for all positions at
+once and the gradient descent works on the whole arrays.
+
+The tuned weights are saved to a JSON file that AlphaBetaMethod loads on
+startup (refer to load_weights).
+
+NumPy is an optional dependency; it's needed only for tuning.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from methods.selfplay import label_positions, self_play_positions
+import state as st
+
+import os
+import re
+import sys
+import json
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+WeightsFolder = 'weights'
+
+
+def weights_path(holes_num, folder=WeightsFolder):
+    """Returns a default file name of the tuned weights for holes_num"""
+    return os.path.join(folder, 'kalah-%d.json' % holes_num)
+
+
+_weights = {}
+
+
+def load_weights(path):
+    """Returns a list of weights from the file or None if there's no such file
+
+    The file is read once per process and the weights are kept for the later
+    calls
+    """
+    if path not in _weights:
+        try:
+            with open(path) as f:
+                _weights[path] = [float(weight) for weight in json.load(f)['weights']]
+        except (OSError, ValueError, KeyError, TypeError):
+            _weights[path] = None
+    return _weights[path]
+
+
+def save_weights(path, weights):
+    """Saves a list of weights to the file"""
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    with open(path, 'w') as f:
+        json.dump({'weights': [float(weight) for weight in weights]}, f)
+
+
+def parse_state(text):
+    """Returns a KalahState for a string made by KalahState.to_string"""
+    numbers = [int(number) for number in re.findall(r'\d+', text)]
+    holes_num = (len(numbers) - 2) // 2
+    state = st.KalahState(0, holes_num)
+    state._holes = [numbers[:holes_num], numbers[holes_num + 1:2*holes_num + 1]]
+    state._kalahs = [numbers[holes_num], numbers[-1]]
+    return state
+
+
+def protocol_positions(path):
+    """Returns positions of a game protocol labelled with the game's result
+
+    Args:
+        path: file name of a protocol written by student_gamer.KalahGamer
+
+    Returns:
+        A list of (pits, player, value, kalahs_difference) tuples (refer to
+        selfplay.label_positions) or an empty list if it's not a protocol or
+        the game wasn't finished normally (time out, wrong move, etc.): its
+        last position says nothing about the result then
+    """
+    states, players, finished = [], [], False
+    with open(path) as f:
+        for line in f:
+            if line.startswith('# Game over.'):
+                finished = True
+            if line.startswith('#') or not line.strip():
+                continue
+            player, hole, text = line.split(' ', 2)
+            if player != '-':
+                players.append(int(player))
+            states.append(parse_state(text))
+    if len(states) < 2 or not finished:
+        return []
+    final_state = states[-1].copy()
+    return label_positions(list(zip(states[:-1], players)), final_state.end_game())
+
+
+def load_protocols(folder='game_logs'):
+    """Returns positions of all game protocols in the folder"""
+    positions = []
+    for name in sorted(os.listdir(folder)):
+        path = os.path.join(folder, name)
+        if not os.path.isfile(path) or not name.endswith('.txt'):
+            continue
+        with open(path) as f:
+            if not f.readline().startswith('# Player 1:'):
+                continue
+        positions += protocol_positions(path)
+    return positions
+
+
+def feature_differences(pits, players, holes_num):
+    """Returns a matrix of the features' differences for all positions at once
+
+    Args:
+        pits: array of the holes' contents, one row per position (refer to
+            KalahState.get_pits)
+        players: array of players who move
+        holes_num: number of holes of each player
+
+    Returns:
+        A matrix with a row per position and a column per feature (refer to
+        KalahState.features): player's feature minus opponent's feature
+    """
+    pits = np.asarray(pits, dtype=np.int64).reshape(-1, 2*holes_num)
+    second = np.asarray(players) == 1
+    pits[second] = np.roll(pits[second], holes_num, axis=1)
+    own, other = pits[:, :holes_num], pits[:, holes_num:]
+    to_kalah = holes_num - np.arange(holes_num)
+
+    def side_features(own, other):
+        features = np.zeros((own.shape[0], 4))
+        features[:, st.FeatureStones] = own.sum(axis=1)
+        features[:, st.FeatureEmptyHoles] = (own == 0).sum(axis=1)
+        features[:, st.FeatureKalahHoles] = ((own > 0) & (own % (2*holes_num + 1) == to_kalah)).sum(axis=1)
+        features[:, st.FeatureCapturable] = ((own == 0) * other[:, ::-1]).sum(axis=1)
+        return features
+
+    return side_features(own, other) - side_features(other, own)
+
+
+def tune(positions, holes_num=6, weights=(0.25, 0.0, 0.0, 0.0), epochs=2000, learning_rate=1.0,
+         be_silent=False):
+    """Fits the evaluation weights to the results of the positions
+
+    Args:
+        positions: list of (pits, player, value, kalahs_difference) tuples
+        holes_num: number of holes of each player
+        weights: initial weights
+        epochs: number of gradient descent steps over all the positions
+        learning_rate: step size
+        be_silent: if True then progress is not printed
+
+    Returns:
+        A list of the tuned weights
+    """
+    features = feature_differences([position[0] for position in positions],
+                                   [position[1] for position in positions], holes_num)
+    kalahs = np.array([position[3] for position in positions], dtype=np.float64)
+    finals = kalahs + np.array([position[2] for position in positions], dtype=np.float64)
+    results = (np.sign(finals) + 1) / 2
+    weights = np.array(weights, dtype=np.float64)
+
+    def predict(scale, weights):
+        return 1 / (1 + np.exp(-scale * (kalahs + features @ weights)))
+
+    # the scale that fits the initial weights best
+    scales = np.linspace(0.05, 2.0, 40)
+    scale = scales[np.argmin([np.mean((predict(scale, weights) - results)**2) for scale in scales])]
+
+    for epoch in range(epochs):
+        predictions = predict(scale, weights)
+        errors = predictions - results
+        gradient = features.T @ (2 * errors * predictions * (1 - predictions) * scale) / len(results)
+        weights -= learning_rate * gradient
+        if not be_silent and (epoch + 1) % 100 == 0:
+            print("Step %d: mean squared error %.5f" % (epoch + 1, np.mean(errors**2)))
+    return weights.tolist()
+
+
+#
+# Tunes the weights on the game protocols and self-play games. Run from the
+# project's root folder:
+#     python -m methods.tuning [self-play games] [steps] [processes]
+#
+if __name__ == "__main__":
+    games = len(sys.argv) > 1 and int(sys.argv[1]) or 1000
+    epochs = len(sys.argv) > 2 and int(sys.argv[2]) or 2000
+    processes = len(sys.argv) > 3 and int(sys.argv[3]) or None
+    positions = [position for position in load_protocols() if len(position[0]) == 12]
+    print("%d positions from the game protocols" % len(positions))
+    positions += self_play_positions(games, processes=processes)
+    print("%d positions in total" % len(positions))
+    weights = tune(positions, epochs=epochs)
+    print("Weights:", weights)
+    save_weights(weights_path(6), weights)
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+"""Value network evaluation for playing Kalah.
+
+Contains a small multilayer perceptron (pure NumPy, CPU only) that estimates
+the value of a position instead of a hand-written _utility, its training on
+self-play games (refer to selfplay.py) and ValueNetworkMethod that uses it.
+
+The network's input is the contents of the holes of the player who moves and
+then of the opponent. The output is in the same units as the values of
+AlphaBetaMethod: the difference between the stones the player and the
+opponent will add to their kalahs till the end of the game.
+
+Calling the network for each leaf separately would waste most of the time in
+Python, so ValueNetworkMethod evaluates all the leaves two moves below a node
+at once (refer to AlphaBetaMethod._prefetch_leaves): one matrix
+multiplication per layer for the whole batch, while the search keeps its
+pruning.
+
+The weights are stored in a .npz file and loaded once per process (refer to
+load_network).
+
+NumPy is an optional dependency: without it ValueNetworkMethod is disabled.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from methods.alphabeta import AlphaBetaMethod
+from methods.selfplay import self_play_positions
+
+import os
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NetworkFolder = 'networks'
+# Inputs are divided by this value to keep them around 1
+InputScale = 10.0
+
+
+def network_path(holes_num, folder=NetworkFolder):
+    """Returns a default file name of the network's weights for holes_num"""
+    return os.path.join(folder, 'kalah-%d.npz' % holes_num)
+
+
+def network_inputs(pits, players, holes_num):
+    """Returns an input matrix of the network
+
+    Args:
+        pits: list of tuples of the holes' contents (refer to
+            KalahState.get_pits)
+        players: list of players who move
+        holes_num: number of holes of each player
+
+    Returns:
+        A matrix with a row per position: the holes of the player who moves,
+        then the holes of the opponent
+    """
+    inputs = np.asarray(pits, dtype=np.float64).reshape(-1, 2*holes_num) / InputScale
+    second = np.asarray(players) == 1
+    inputs[second] = np.roll(inputs[second], holes_num, axis=1)
+    return inputs
+
+
+class ValueNetwork(object):
+    """Multilayer perceptron with tanh hidden layers and a linear output
+
+    Attributes:
+        _layers: list of (weights, biases) arrays of each layer
+    """
+    _layers = None
+
+    def __init__(self, layers):
+        """Inits a network with a list of (weights, biases) arrays"""
+        self._layers = layers
+
+    def layers(self):
+        """Returns a list of (weights, biases) arrays"""
+        return self._layers
+
+    def holes_num(self):
+        """Returns number of holes of each player"""
+        return self._layers[0][0].shape[0] // 2
+
+    def evaluate(self, inputs):
+        """Returns a vector of values for an input matrix (one row per position)"""
+        outputs = inputs
+        for weights, biases in self._layers[:-1]:
+            outputs = np.tanh(outputs @ weights + biases)
+        weights, biases = self._layers[-1]
+        return (outputs @ weights + biases)[:, 0]
+
+    def save(self, path):
+        """Saves the weights to a .npz file"""
+        folder = os.path.dirname(path)
+        if folder and not os.path.isdir(folder):
+            os.makedirs(folder)
+        np.savez(path, *[array for layer in self._layers for array in layer])
+
+
+def new_network(holes_num, hidden=(64,), seed=0):
+    """Returns a network with random weights
+
+    Args:
+        holes_num: number of holes of each player
+        hidden: sizes of the hidden layers
+        seed: seed of the random weights
+    """
+    rng = np.random.default_rng(seed)
+    sizes = [2*holes_num] + list(hidden) + [1]
+    return ValueNetwork([(rng.normal(0, 1/np.sqrt(inputs), (inputs, outputs)), np.zeros(outputs))
+                         for inputs, outputs in zip(sizes[:-1], sizes[1:])])
+
+
+_networks = {}
+
+
+def load_network(path):
+    """Returns a ValueNetwork for the file or None if there's no such file
+
+    The network is loaded once per process and is kept for the later calls
+    """
+    if path not in _networks:
+        try:
+            with np.load(path) as arrays:
+                arrays = [arrays['arr_%d' % i] for i in range(len(arrays.files))]
+            _networks[path] = ValueNetwork(list(zip(arrays[0::2], arrays[1::2])))
+        except (OSError, ValueError, KeyError):
+            _networks[path] = None
+    return _networks[path]
+
+
+def train(positions, holes_num=6, hidden=(64,), epochs=30, batch_size=256, learning_rate=0.001,
+          seed=0, be_silent=False):
+    """Trains a network on the labelled positions
+
+    It minimizes the mean squared error with Adam.
+
+    Args:
+        positions: list of (pits, player, value, ...) tuples (refer to
+            selfplay.self_play_positions)
+        holes_num: number of holes of each player
+        hidden: sizes of the hidden layers
+        epochs: number of passes over the positions
+        batch_size: number of positions in one gradient step
+        learning_rate: Adam's step size
+        seed: seed of the initial weights and of the shuffling
+        be_silent: if True then progress is not printed
+
+    Returns:
+        A trained ValueNetwork
+    """
+    inputs = network_inputs([position[0] for position in positions],
+                            [position[1] for position in positions], holes_num)
+    targets = np.array([position[2] for position in positions], dtype=np.float64)
+    network = new_network(holes_num, hidden, seed)
+    parameters = [array for layer in network.layers() for array in layer]
+    moments = [np.zeros_like(array) for array in parameters]
+    squares = [np.zeros_like(array) for array in parameters]
+    beta1, beta2, epsilon = 0.9, 0.999, 1e-8
+    rng = np.random.default_rng(seed)
+    step = 0
+
+    for epoch in range(epochs):
+        order = rng.permutation(len(targets))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            # forward pass keeps outputs of all layers
+            outputs = [inputs[batch]]
+            for weights, biases in network.layers()[:-1]:
+                outputs.append(np.tanh(outputs[-1] @ weights + biases))
+            weights, biases = network.layers()[-1]
+            errors = (outputs[-1] @ weights + biases)[:, 0] - targets[batch]
+
+            # backward pass
+            gradients = []
+            delta = (2.0 / len(batch) * errors)[:, None]
+            for layer in range(len(network.layers()) - 1, -1, -1):
+                weights, biases = network.layers()[layer]
+                gradients = [outputs[layer].T @ delta, delta.sum(axis=0)] + gradients
+                if layer:
+                    delta = (delta @ weights.T) * (1 - outputs[layer]**2)
+
+            step += 1
+            for parameter, gradient, moment, square in zip(parameters, gradients, moments, squares):
+                moment *= beta1
+                moment += (1 - beta1) * gradient
+                square *= beta2
+                square += (1 - beta2) * gradient**2
+                parameter -= learning_rate * (moment / (1 - beta1**step)) / \
+                    (np.sqrt(square / (1 - beta2**step)) + epsilon)
+
+        if not be_silent:
+            loss = np.mean((network.evaluate(inputs) - targets)**2)
+            print("Epoch %d: mean squared error %.3f" % (epoch + 1, loss))
+    return network
+
+
+class ValueNetworkMethod(AlphaBetaMethod):
+    """Class with alpha-beta method that evaluates the leaves with a value network
+
+    If there is no weights file then _utility is used.
+
+    There is no futility pruning: its margins are tuned for _utility, the
+    network's values have their own scale, and the static value of every
+    node above the leaves would cost a network evaluation that is not in
+    the batches.
+
+    Attributes:
+        Please refer to alphabeta.py for details
+    """
+    _name = "Alpha-beta with value network"
+    _short_name = "Alpha-beta-NN"
+    _disabled = np is None
+    _batch_leaves = True
+    _futility_margins = []
+
+    def _evaluation_parameters(self, holes_num):
+        """Adds the network's file to the parameters (refer to
+        AlphaBetaMethod._evaluation_parameters)"""
+        path = network_path(holes_num)
+        network_file = os.path.isfile(path) and (os.path.getmtime(path), os.path.getsize(path))
+        return super(ValueNetworkMethod, self)._evaluation_parameters(holes_num) + [network_file]
+
+    def _evaluate_batch(self, states, players):
+        """Evaluates the states with the value network in one batch
+
+        Args:
+            Please refer to AlphaBetaMethod._evaluate_batch for details
+        """
+        holes_num = states[0].holes_num()
+        network = load_network(network_path(holes_num))
+        if not network or network.holes_num() != holes_num:
+            return super(ValueNetworkMethod, self)._evaluate_batch(states, players)
+        return network.evaluate(network_inputs([state.get_pits() for state in states], players, holes_num)).tolist()
+
+
+#
+# Trains a network on self-play games. Run from the project's root folder:
+#     python -m methods.valuenet [games] [epochs] [processes]
+#
+if __name__ == "__main__":
+    games = len(sys.argv) > 1 and int(sys.argv[1]) or 1000
+    epochs = len(sys.argv) > 2 and int(sys.argv[2]) or 30
+    processes = len(sys.argv) > 3 and int(sys.argv[3]) or None
+    positions = self_play_positions(games, processes=processes)
+    print("%d positions from %d games" % (len(positions), games))
+    train(positions, epochs=epochs).save(network_path(6))
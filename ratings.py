@@ -0,0 +1,248 @@
+#!/usr/bin/env python
+"""Ratings of the players of Kalah tournaments
+
+The ratings follow the Bradley-Terry model: the expected score of the player
+i against the player j is
+
+    1 / (1 + exp(r_j - r_i))
+
+(a draw counts as a half of a win). They are shown in Elo points (400 Elo
+points per 10 times better odds).
+
+The ratings are not fitted to all games again after every game: the table of
+the scores between every pair of players is kept and a few Newton steps from
+the current ratings bring them to the new maximum of the likelihood. Each
+player has a virtual draw against a player with the rating 0, so a player
+that wins all games still gets a finite rating. The confidence interval of a
+rating is taken from the curvature of the likelihood (Fisher information).
+
+SPRT decides a match between a changed method and its baseline as soon as
+the result is statistically clear.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import math
+
+# Elo points per the unit of the Bradley-Terry rating
+EloScale = 400 / math.log(10)
+# Quantile of the normal distribution for the 95% confidence interval
+Confidence95 = 1.96
+
+
+def expected_score(rating, other_rating):
+    """Returns expected score of a player against other one (Bradley-Terry)"""
+    return 1 / (1 + math.exp(other_rating - rating))
+
+
+def game_points(result):
+    """Returns points of the both players of a game result
+
+    Args:
+        result: game result of KalahGamer (refer to KalahGamer.end_game)
+
+    Returns:
+        A tuple of points (1 - win, 0.5 - draw, 0 - loss) of the first and
+        the second player
+    """
+    if result['winner'] == 1:
+        return 1.0, 0.0
+    if result['winner'] == 2:
+        return 0.0, 1.0
+    return 0.5, 0.5
+
+
+class Ratings(object):
+    """Class that keeps the ratings of players and updates them game by game
+
+    Attributes:
+        _ratings: dictionary of the players' ratings (Bradley-Terry units)
+        _scores: dictionary of the players' dictionaries with the points and
+            the number of games against each opponent
+        _iterations: number of Newton steps after each game
+    """
+    _ratings = None
+    _scores = None
+    _iterations = 3
+
+    def __init__(self, players=(), iterations=3):
+        self._ratings = {}
+        self._scores = {}
+        self._iterations = iterations
+        for player in players:
+            self._add_player(player)
+
+    def _add_player(self, player):
+        if player not in self._ratings:
+            self._ratings[player] = 0.0
+            self._scores[player] = {}
+
+    def add_game(self, player_1, player_2, points_1):
+        """Adds a game and updates the ratings
+
+        Args:
+            player_1, player_2: players of the game
+            points_1: points of the first player (1 - win, 0.5 - draw, 0 -
+                loss)
+        """
+        for player, opponent, points in [(player_1, player_2, points_1), (player_2, player_1, 1 - points_1)]:
+            self._add_player(player)
+            score = self._scores[player].setdefault(opponent, [0.0, 0])
+            score[0] += points
+            score[1] += 1
+        for iteration in range(self._iterations):
+            self._newton_step()
+
+    def add_result(self, result):
+        """Adds a game result of KalahGamer (refer to game_points)"""
+        self.add_game(result['players'][0], result['players'][1], game_points(result)[0])
+
+    def _information(self, player):
+        """Returns the gradient and the curvature of the log-likelihood by the
+        player's rating (with the virtual draw)"""
+        rating = self._ratings[player]
+        expected = expected_score(rating, 0.0)
+        gradient, curvature = 0.5 - expected, expected * (1 - expected)
+        for opponent, (points, games) in self._scores[player].items():
+            expected = expected_score(rating, self._ratings[opponent])
+            gradient += points - games * expected
+            curvature += games * expected * (1 - expected)
+        return gradient, curvature
+
+    def _newton_step(self):
+        for player in self._ratings:
+            gradient, curvature = self._information(player)
+            self._ratings[player] += gradient / curvature
+
+    def rating(self, player):
+        """Returns a tuple of the player's Elo rating and the half-width of its
+        95% confidence interval"""
+        curvature = self._information(player)[1]
+        return self._ratings[player] * EloScale, Confidence95 * EloScale / math.sqrt(curvature)
+
+    def table(self):
+        """Returns a list of (player, Elo, interval, points, games) tuples sorted
+        by the rating"""
+        rows = []
+        for player in self._ratings:
+            elo, interval = self.rating(player)
+            points = sum(score[0] for score in self._scores[player].values())
+            games = sum(score[1] for score in self._scores[player].values())
+            rows.append((player, elo, interval, points, games))
+        return sorted(rows, key=lambda row: -row[1])
+
+    def to_string(self):
+        lines = ["{:<4} {:<20} {:>6} {:>6} {:>7} {:>6}".format("Rank", "Player", "Elo", "+/-", "Points", "Games")]
+        for rank, (player, elo, interval, points, games) in enumerate(self.table()):
+            lines.append("{:<4} {:<20} {:>6.0f} {:>6.0f} {:>7} {:>6}".format(rank + 1, player, elo, interval,
+                                                                             points, games))
+        return "\n".join(lines)
+
+
+def elo_score(elo):
+    """Returns expected score of a player that is elo points better"""
+    return 1 / (1 + 10**(-elo / 400))
+
+
+class SPRT(object):
+    """Sequential probability ratio test of a match of paired games
+
+    A pair is two games of the tested player against the baseline from the
+    same start with both colors; the pairs are independent even when the
+    start favors one color. The test compares two hypotheses about the Elo
+    difference of the tested player: H0 - it's elo0, H1 - it's elo1. The
+    log-likelihood ratio is the normal approximation of the generalized SPRT
+    over the pairs' scores:
+
+        LLR = pairs * (s1 - s0) * (2*s - s0 - s1) / (2*variance)
+
+    where s is the mean score of a pair (0..1), s0 and s1 are the expected
+    scores under H0 and H1. The test stops when LLR leaves the bounds given
+    by the error probabilities alpha (accepting H1 when H0 is true) and beta
+    (accepting H0 when H1 is true).
+
+    The variance is shrunk toward 0.25 (the largest possible) by one virtual
+    pair, so a match where all pairs end the same way still gets decided
+    after a few pairs instead of at once or never.
+
+    Attributes:
+        _elo0, _elo1: Elo differences of the hypotheses
+        _alpha, _beta: error probabilities
+        _pairs: numbers of the pairs by the tested player's points in them
+            (0, 0.5, 1, 1.5, 2)
+    """
+    _elo0 = 0
+    _elo1 = 10
+    _alpha = 0.05
+    _beta = 0.05
+    _pairs = None
+
+    def __init__(self, elo0=0, elo1=10, alpha=0.05, beta=0.05):
+        self._elo0, self._elo1 = elo0, elo1
+        self._alpha, self._beta = alpha, beta
+        self._pairs = [0]*5
+
+    def add_pair(self, points):
+        """Adds a pair by the tested player's points in its two games (0..2)"""
+        self._pairs[int(round(points * 2))] += 1
+
+    def pairs(self):
+        return sum(self._pairs)
+
+    def score(self):
+        """Returns mean score of the tested player"""
+        return sum(count * index / 4 for index, count in enumerate(self._pairs)) / max(1, self.pairs())
+
+    def llr(self):
+        """Returns log-likelihood ratio of H1 against H0"""
+        pairs = self.pairs()
+        if not pairs:
+            return 0.0
+        score = self.score()
+        variance = sum(count * (index / 4 - score)**2 for index, count in enumerate(self._pairs))
+        variance = (variance + 0.25) / (pairs + 1)
+        score0, score1 = elo_score(self._elo0), elo_score(self._elo1)
+        return pairs * (score1 - score0) * (2*score - score0 - score1) / (2*variance)
+
+    def bounds(self):
+        """Returns the lower and the upper bounds of LLR"""
+        return math.log(self._beta / (1 - self._alpha)), math.log((1 - self._beta) / self._alpha)
+
+    def status(self):
+        """Returns 'H1' or 'H0' if the hypothesis is accepted, else None"""
+        llr = self.llr()
+        lower, upper = self.bounds()
+        if llr >= upper:
+            return 'H1'
+        if llr <= lower:
+            return 'H0'
+        return None
+
+    def to_string(self):
+        lower, upper = self.bounds()
+        return "Pairs {} {}, score {:.3f}, LLR {:.2f} ({:.2f}, {:.2f}) [{}, {}]".format(
+            self.pairs(), self._pairs, self.score(), self.llr(), lower, upper, self._elo0, self._elo1)
+
+
+if __name__ == "__main__":
+    ratings = Ratings()
+    for game in range(10):
+        ratings.add_game("Alpha-beta", "Random", 1)
+        ratings.add_game("Alpha-beta", "MCTS", game % 3 and 1 or 0.5)
+        ratings.add_game("MCTS", "Random", game % 4 and 1 or 0)
+    print(ratings.to_string())
@@ -0,0 +1,591 @@
+#!/usr/bin/env python
+"""Kalah game server
+
+The server hosts many games at once for players that connect over a local
+TCP socket: engines (refer to play_engine), humans (e.g. with telnet or nc)
+or any other program that speaks the line protocol. Everything runs on one
+asyncio event loop: the clocks of the games are timers of the loop, so there
+is no thread or process per game.
+
+Protocol. Every message is one line of words separated by spaces; players
+are numbered 0 and 1 (player 0 moves first), holes are numbered from 0 as in
+the game protocols of student_gamer.py.
+
+Commands of a client:
+    NAME <name>                         - name of the client for the results
+    NEW [stones [turn_time [clock]]]    - creates a game; turn_time is the
+                                          time limit of a move in seconds,
+                                          clock is the total time of each
+                                          player in seconds (0 - no clock)
+    JOIN <game> [player]                - takes a seat in a game
+    SEEK [stones [turn_time [clock]]]   - takes a seat in a waiting game with
+                                          the same settings or creates one
+    WATCH <game>                        - gets the events of a game
+    MOVE <game> <hole>                  - makes a move
+    RESIGN <game>                       - resigns a game
+    LIST                                - lists the games
+    RATINGS                             - lists the ratings of the names (a
+                                          game between two clients with the
+                                          same name isn't rated)
+    QUIT                                - closes the connection
+
+Messages of the server:
+    GAME <game>                         - a game is created
+    JOINED <game> <player>              - the client has a seat in a game
+    WATCHING <game>                     - the client watches a game
+    START <game> <name 0> <name 1>      - a game starts
+    STATE <game> <player to move> <holes 0> <kalah 0> <holes 1> <kalah 1>
+    TURN <game> <player> <seconds>      - the player should move in seconds
+    MOVED <game> <player> <hole>        - a move is made
+    OVER <game> <winner> <score 0> <score 1> <reason>
+                                        - a game is over; the winner is 1 or
+                                          2 (0 - a draw) and the scores are
+                                          -1 if the game is lost by the
+                                          reason (refer to KalahGamer)
+    CLOSED <game>                       - a game that didn't start is
+                                          removed
+    INFO <game> <status> <stones> <turn_time> <clock> <name 0> <name 1>
+    RATING <name> <elo> <interval> <points> <games>
+    OK                                  - end of a list
+    ERROR <message>                     - a command is wrong
+
+A client that creates a game with SEEK takes the color opposite to the one
+its name had in its previous game (player 0 if there was none), the client
+that joins the game takes the other one. So the clients that seek against
+each other play with both colors in turn and the first move's advantage
+doesn't go to the ratings.
+
+A player loses on time, on a wrong move and when it disconnects during the
+game. A game that didn't start is removed when its last player leaves, or
+after WaitingTimeout seconds if nobody has joined it.
+
+@author: Oleksii Molchanovskyi
+@organization: Ukrainian Catholic University
+@country: Ukraine
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+GNU General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program.  If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import state as st
+from ratings import Ratings
+
+import sys
+import time
+import asyncio
+
+DefaultHost = '127.0.0.1'
+DefaultPort = 5555
+# A move may take a bit longer than its time limit (the same as KalahGamer)
+TimeMargin = 1.1
+# A client that has more bytes not sent yet is dropped (it doesn't read)
+MaxBufferSize = 256*1024
+# A game that nobody has joined is removed after this number of seconds
+WaitingTimeout = 300
+
+#
+# Statuses of a game
+#
+GameWaiting = 'waiting'
+GamePlaying = 'playing'
+GameOver = 'over'
+
+
+def state_words(state):
+    """Returns the holes and the kalahs of a state as a list of words"""
+    words = []
+    for player in [0, 1]:
+        words += [str(stones) for stones in state.player_holes(player)] + [str(state.player_kalah(player))]
+    return words
+
+
+def parse_state(words):
+    """Returns a KalahState of the words of a STATE message after the player
+    to move (refer to state_words)"""
+    holes_num = len(words) // 2 - 1
+    numbers = list(map(int, words))
+    state = st.KalahState(0, holes_num)
+    state._holes = [numbers[:holes_num], numbers[holes_num + 1:2*holes_num + 1]]
+    state._kalahs = [numbers[holes_num], numbers[2*holes_num + 1]]
+    return state
+
+
+class Client(object):
+    """Connection of a client
+
+    Attributes:
+        name: name of the client
+        games: set of the games where the client has a seat
+        watching: set of the games that the client watches
+    """
+    name = ""
+    games = None
+    watching = None
+
+    def __init__(self, name, writer):
+        self.name = name
+        self.games = set()
+        self.watching = set()
+        self._writer = writer
+
+    def send(self, *words):
+        """Sends a message to the client
+
+        The messages to the opponents and the watchers are not waited for,
+        so a client that falls behind by MaxBufferSize is dropped instead of
+        growing the server's buffers (it loses its games as on disconnect).
+        """
+        if not self._writer.is_closing():
+            self._writer.write((" ".join(map(str, words)) + "\n").encode())
+            if self._writer.transport.get_write_buffer_size() > MaxBufferSize:
+                self._writer.transport.abort()
+
+
+class ServerGame(object):
+    """Class that keeps a game of the server and its clocks
+
+    Attributes:
+        id: number of the game
+        status: GameWaiting, GamePlaying or GameOver
+        number_of_stones: number of stones in each hole on game startup
+        turn_time: time limit of a move in seconds
+        clock: total time of each player in seconds (0 - no clock)
+        seats: list of the clients of the players (None - a free seat)
+        watchers: set of the clients that watch the game
+        state: KalahState of the game
+        active_player: player who moves
+        clocks: list of the players' remaining times
+        history: list of (player, hole) of the moves
+        result: game result (refer to KalahGamer.end_game) when it's over
+    """
+    id = 0
+    status = GameWaiting
+    number_of_stones = 5
+    turn_time = 30
+    clock = 0
+    seats = None
+    watchers = None
+    state = None
+    active_player = 0
+    clocks = None
+    history = None
+    result = None
+
+    def __init__(self, game_id, number_of_stones=5, turn_time=30, clock=0, on_over=None):
+        """Inits a game
+
+        Args:
+            game_id: number of the game
+            number_of_stones: number of stones in each hole on game startup
+            turn_time: time limit of a move in seconds
+            clock: total time of each player in seconds (0 - no clock)
+            on_over: function that gets the game when it's over
+        """
+        self.id = game_id
+        self.number_of_stones = number_of_stones
+        self.turn_time = turn_time
+        self.clock = clock
+        self.seats = [None, None]
+        self.watchers = set()
+        self.state = st.KalahState(number_of_stones)
+        self.clocks = [clock, clock]
+        self.history = []
+        self._on_over = on_over
+        self._timer = None
+        self._turn_start = 0
+        self._start_time = 0
+
+    def names(self):
+        return [seat.name if seat else "-" for seat in self.seats]
+
+    def settings(self):
+        """Returns a tuple of the settings that SEEK matches"""
+        return self.number_of_stones, self.turn_time, self.clock
+
+    def broadcast(self, *words):
+        """Sends a message to the players and the watchers"""
+        for client in set(seat for seat in self.seats if seat) | self.watchers:
+            client.send(*words)
+
+    def send_state(self, client=None):
+        words = ["STATE", self.id, self.active_player] + state_words(self.state)
+        if client:
+            client.send(*words)
+        else:
+            self.broadcast(*words)
+
+    def start(self):
+        self.status = GamePlaying
+        self._start_time = time.time()
+        self.broadcast("START", self.id, *self.names())
+        self._next_turn()
+
+    def _next_turn(self):
+        """Sends the state and starts the clock of the active player"""
+        loop = asyncio.get_running_loop()
+        limit = self.turn_time
+        if self.clock:
+            limit = min(limit, self.clocks[self.active_player])
+        self._turn_start = loop.time()
+        self._timer = loop.call_later(limit * TimeMargin, self.end_on_loss, 'timeout')
+        self.send_state()
+        self.broadcast("TURN", self.id, self.active_player, "%.2f" % limit)
+
+    def move(self, player, hole):
+        """Makes a move of a player; a wrong move loses the game"""
+        self._timer.cancel()
+        if self.clock:
+            elapsed = asyncio.get_running_loop().time() - self._turn_start
+            self.clocks[player] = max(0, self.clocks[player] - elapsed)
+
+        if hole < 0 or hole >= self.state.holes_num():
+            move_result = st.WrongMove
+        else:
+            move_result = self.state.move(player, hole, record=False)
+        if move_result == st.WrongMove:
+            self.end_on_loss('wrong move')
+            return
+        self.history.append((player, hole))
+        self.broadcast("MOVED", self.id, player, hole)
+
+        if move_result != st.MoveEndsInPlayersKalah:
+            self.active_player = (self.active_player + 1) % 2
+        if self.state.is_finished(self.active_player):
+            score = self.state.end_game()
+            winner = score[0] > score[1] and 1 or score[0] < score[1] and 2 or 0
+            self._end(winner, tuple(score), 'normal')
+        else:
+            self._next_turn()
+
+    def end_on_loss(self, reason, player=None):
+        """Ends the game with a loss of the player (the active one by default)"""
+        if player is None:
+            player = self.active_player
+        self._end(2 - player, (-1, -1), reason)
+
+    def _end(self, winner, score, reason):
+        if self._timer:
+            self._timer.cancel()
+        self.status = GameOver
+        if reason == 'normal':
+            msg = winner and "Game over. Player %d wins!" % (winner,) or "Game over. It's a draw!"
+            msg += " Score %d:%d" % score
+            score_text = "%d:%d" % score
+        else:
+            msg = "%s. Player %d wins!" % (reason.capitalize(), winner)
+            score_text = "?:?"
+        self.result = {'message': msg, 'score_text': score_text, 'score': score, 'winner': winner,
+                       'reason': reason, 'total_time': time.time() - self._start_time,
+                       'players': tuple(self.names())}
+        self.send_state()
+        self.broadcast("OVER", self.id, winner, score[0], score[1], reason.replace(' ', '_'))
+        if self._on_over:
+            self._on_over(self)
+
+
+class GameServer(object):
+    """Class that hosts the games and serves the clients
+
+    Attributes:
+        games: dictionary of the games that are not over by their numbers
+        results: list of the results of the finished games
+        ratings: Ratings of the clients' names (refer to RATINGS)
+        result_file: file of the results in the format of KalahGamer or None
+        last_players: dictionary of the players of the clients' names in
+            their last started games (refer to SEEK)
+    """
+    games = None
+    results = None
+    ratings = None
+    result_file = None
+    last_players = None
+
+    def __init__(self, host=DefaultHost, port=DefaultPort, result_file=None, be_silent=False):
+        self.host = host
+        self.port = port
+        self.result_file = result_file
+        self.be_silent = be_silent
+        self.games = {}
+        self.results = []
+        self.ratings = Ratings()
+        self.last_players = {}
+        self._last_id = 0
+        self._clients_num = 0
+        self._server = None
+        self._commands = {'NAME': self._name, 'NEW': self._new, 'JOIN': self._join, 'SEEK': self._seek,
+                          'WATCH': self._watch, 'MOVE': self._move, 'RESIGN': self._resign,
+                          'LIST': self._list, 'RATINGS': self._ratings}
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        if not self.be_silent:
+            print("Kalah server is listening on {}:{}".format(self.host, self.port))
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        self._server.close()
+
+    async def _serve_client(self, reader, writer):
+        self._clients_num += 1
+        client = Client("guest-%d" % (self._clients_num,), writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                words = line.decode(errors='replace').split()
+                if not words:
+                    continue
+                command = words[0].upper()
+                if command == 'QUIT':
+                    break
+                if command not in self._commands:
+                    client.send("ERROR", "unknown command", command)
+                    continue
+                try:
+                    self._commands[command](client, words[1:])
+                except (ValueError, IndexError):
+                    client.send("ERROR", "wrong arguments of", command)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            # the client is gone or the server is closed
+            pass
+        finally:
+            self._disconnect(client)
+            writer.close()
+
+    def _disconnect(self, client):
+        """Frees the client's seats; the client loses the started games"""
+        for game in list(client.games):
+            player = game.seats.index(client)
+            if game.status == GamePlaying:
+                game.end_on_loss('disconnect', player)
+            else:
+                game.seats[player] = None
+                client.games.discard(game)
+                if not any(game.seats):
+                    self._close_game(game)
+        for game in list(client.watching):
+            game.watchers.discard(client)
+
+    def _game(self, word):
+        game = self.games.get(int(word))
+        if not game:
+            raise ValueError()
+        return game
+
+    def _settings(self, args):
+        """Returns (stones, turn_time, clock) of the arguments of NEW and SEEK"""
+        number_of_stones = len(args) > 0 and int(args[0]) or 5
+        turn_time = len(args) > 1 and float(args[1]) or 30
+        clock = len(args) > 2 and float(args[2]) or 0
+        if number_of_stones <= 0 or turn_time <= 0 or clock < 0:
+            raise ValueError()
+        return number_of_stones, turn_time, clock
+
+    def _create_game(self, settings):
+        self._last_id += 1
+        game = ServerGame(self._last_id, *settings, on_over=self._game_over)
+        self.games[game.id] = game
+        asyncio.get_running_loop().call_later(WaitingTimeout, self._expire_game, game)
+        return game
+
+    def _expire_game(self, game):
+        if game.status == GameWaiting and not any(game.seats) and game.id in self.games:
+            self._close_game(game)
+
+    def _close_game(self, game):
+        """Removes a game that didn't start"""
+        del self.games[game.id]
+        game.broadcast("CLOSED", game.id)
+        for client in game.watchers:
+            client.watching.discard(game)
+
+    def _take_seat(self, client, game, player):
+        game.seats[player] = client
+        client.games.add(game)
+        client.send("JOINED", game.id, player)
+        if all(game.seats):
+            for seat_player, seat in enumerate(game.seats):
+                self.last_players[seat.name] = seat_player
+            game.start()
+
+    def _name(self, client, args):
+        client.name = args[0]
+        client.send("OK")
+
+    def _new(self, client, args):
+        client.send("GAME", self._create_game(self._settings(args)).id)
+
+    def _join(self, client, args):
+        game = self._game(args[0])
+        free = [player for player in [0, 1] if not game.seats[player]]
+        player = int(args[1]) if len(args) > 1 else free and free[0]
+        if game.status != GameWaiting or player not in free or client in game.seats:
+            client.send("ERROR", "no free seat in game", game.id)
+            return
+        self._take_seat(client, game, player)
+
+    def _seek(self, client, args):
+        settings = self._settings(args)
+        for game in self.games.values():
+            if game.status == GameWaiting and game.settings() == settings and any(game.seats) and \
+                    client not in game.seats:
+                break
+        else:
+            game = self._create_game(settings)
+            self._take_seat(client, game, 1 - self.last_players.get(client.name, 1))
+            return
+        self._take_seat(client, game, game.seats.index(None))
+
+    def _watch(self, client, args):
+        game = self._game(args[0])
+        game.watchers.add(client)
+        client.watching.add(game)
+        client.send("WATCHING", game.id)
+        if game.status == GamePlaying:
+            game.send_state(client)
+
+    def _move(self, client, args):
+        game, hole = self._game(args[0]), int(args[1])
+        if game.status != GamePlaying or game.seats[game.active_player] is not client:
+            client.send("ERROR", "not your turn in game", game.id)
+            return
+        game.move(game.active_player, hole)
+
+    def _resign(self, client, args):
+        game = self._game(args[0])
+        if game.status != GamePlaying or client not in game.seats:
+            client.send("ERROR", "you don't play game", game.id)
+            return
+        game.end_on_loss('resign', game.seats.index(client))
+
+    def _list(self, client, args):
+        for game in self.games.values():
+            client.send("INFO", game.id, game.status, game.number_of_stones, game.turn_time, game.clock,
+                        *game.names())
+        client.send("OK")
+
+    def _ratings(self, client, args):
+        for player, elo, interval, points, games in self.ratings.table():
+            client.send("RATING", player, "%.0f" % elo, "%.0f" % interval, points, games)
+        client.send("OK")
+
+    def _game_over(self, game):
+        del self.games[game.id]
+        for client in game.seats:
+            client.games.discard(game)
+        for client in game.watchers:
+            client.watching.discard(game)
+        self.results.append(game.result)
+        # several clients may play with the same name (e.g. the processes of
+        # one engine), a game between them says nothing about the name
+        if game.result['players'][0] != game.result['players'][1]:
+            self.ratings.add_result(game.result)
+        if not self.be_silent:
+            print("Game {}: {} vs. {}. {}".format(game.id, *game.result['players'], game.result['message']))
+
+        if self.result_file:
+            secs = game.result['total_time']
+            with open(self.result_file, 'a') as f:
+                f.write("{} | {} | {} vs. {} | {} {}\n".format(
+                    time.strftime('%d.%m.%Y %H:%M'),
+                    "%02d:%02d:%02d" % (secs / 3600, secs / 60 % 60, secs % 60),
+                    game.result['players'][0], game.result['players'][1], game.result['winner'],
+                    game.result['reason'] != 'normal' and game.result['reason'].capitalize() or
+                    game.result['score_text']))
+
+
+async def play_engine(player_title, host=DefaultHost, port=DefaultPort, games=1, number_of_stones=5,
+                      turn_time=30, clock=0, method_path='methods', node_limit=0):
+    """Plays games on a server with a method
+
+    The client seeks the games one by one; the method thinks in a separate
+    thread, so the connection is served while it thinks.
+
+    Args:
+        player_title: short title of the method
+        games: number of games to play
+        number_of_stones, turn_time, clock: settings of the games (refer to
+            the SEEK command)
+        method_path: folder of the methods
+        node_limit: node budget of a move (refer to Method.set_node_limit)
+
+    Returns:
+        A list of the game results as (winner, score 0, score 1, reason, the
+        method's player)
+    """
+    from student_gamer import KalahGamer
+    methods = KalahGamer(method_path=method_path, be_silent=True, store_results=False).methods
+    method_class = [method['class'] for method in methods.values() if method['short_title'] == player_title][0]
+
+    loop = asyncio.get_running_loop()
+    reader, writer = await asyncio.open_connection(host, port)
+    client = Client(player_title, writer)
+    client.send("NAME", player_title)
+    client.send("SEEK", number_of_stones, turn_time, clock)
+
+    results = []
+    game_id, player, obj, state = None, 0, None, None
+    while len(results) < games:
+        line = await reader.readline()
+        if not line:
+            break
+        words = line.decode().split()
+        if words[0] == 'JOINED':
+            game_id, player = words[1], int(words[2])
+            obj = method_class(player)
+            obj.set_node_limit(node_limit)
+        elif len(words) < 2 or words[1] != game_id:
+            continue
+        elif words[0] == 'STATE':
+            state = parse_state(words[3:])
+        elif words[0] == 'TURN' and int(words[2]) == player:
+            obj.set_run_time_limit(float(words[3]))
+            hole = await loop.run_in_executor(None, obj.make_move, state.copy())
+            client.send("MOVE", game_id, hole)
+        elif words[0] == 'OVER':
+            obj.game_over()
+            results.append((int(words[2]), int(words[3]), int(words[4]), words[5], player))
+            game_id = None
+            if len(results) < games:
+                client.send("SEEK", number_of_stones, turn_time, clock)
+        await writer.drain()
+
+    client.send("QUIT")
+    writer.close()
+    return results
+
+
+#
+# Runs the server:
+#     python server.py [port]
+# Plays games on the server with a method:
+#     python server.py <port> <player> [games] [turn time]
+#
+if __name__ == "__main__":
+    port = len(sys.argv) > 1 and int(sys.argv[1]) or DefaultPort
+    if len(sys.argv) > 2:
+        games = len(sys.argv) > 3 and int(sys.argv[3]) or 1
+        turn_time = len(sys.argv) > 4 and float(sys.argv[4]) or 5
+        for result in asyncio.run(play_engine(sys.argv[2], port=port, games=games, turn_time=turn_time)):
+            print("Winner {}, score {}:{}, {} (played as {})".format(*result))
+    else:
+        try:
+            asyncio.run(GameServer(port=port, result_file='results.txt').serve_forever())
+        except KeyboardInterrupt:
+            pass
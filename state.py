@@ -19,8 +19,6 @@ You should have received a copy of the GNU General Public License
 along with this program.  If not, see <http://www.gnu.org/licenses/>.
 """
 
-from copy import deepcopy
-
 #
 # Constans that are used to return turn results up to the calling program
 #
@@ -36,6 +34,95 @@ MoveEndsInPlayersEmptyHole = 3
 # Current move is wrong (we've got some error)
 WrongMove = 4
 
+#
+# Indexes of the evaluation features of the player's side (refer to 
+# KalahState.features)
+#
+
+# Amount of stones in the player's holes
+FeatureStones = 0
+# Number of the player's empty holes
+FeatureEmptyHoles = 1
+# Number of the player's holes from which the last stone gets to the kalah
+FeatureKalahHoles = 2
+# Amount of the opponent's stones opposite to the player's empty holes
+FeatureCapturable = 3
+
+
+def canonical_pits(pits, holes_num, player):
+    """Returns the holes' contents as seen by the player who moves
+    
+    A position with player 1 to move is the mirror of the position with the 
+    sides swapped and player 0 to move. Values of the search methods are 
+    the differences between what the player who moves and the opponent will 
+    add to their kalahs, so the both positions have the same value and the 
+    same best hole. Tables keyed by the canonical form don't need the player 
+    and keep each position once.
+    
+    Args:
+        pits: tuple of player 0 holes followed by player 1 holes
+        holes_num: number of holes of each player
+        player: player who moves (0 or 1)
+        
+    Returns:
+        A tuple of the player's holes followed by the opponent's holes
+    """
+    if not player:
+        return pits
+    return pits[holes_num:] + pits[:holes_num]
+
+
+def sow(pits, holes_num, player, hole_num):
+    """Makes a move on a compact board
+    
+    It implements the same rules as KalahState.move but works with a tuple
+    of the holes' contents (refer to KalahState.get_pits) and doesn't store 
+    any intermediate states. It is used where millions of positions have to
+    be played (tablebases, solvers).
+    
+    Args:
+        pits: tuple of player 0 holes followed by player 1 holes
+        holes_num: number of holes of each player
+        player: current player number (0 or 1)
+        hole_num: number of hole or pit from which the move begins
+        
+    Returns:
+        A tuple (new_pits, kalah_add, result) where kalah_add is amount of 
+        stones added to the player's kalah and result is MoveEnds, 
+        MoveEndsInPlayersKalah or WrongMove
+    """
+    own = player * holes_num
+    other = holes_num - own
+    stones = pits[own + hole_num] if 0 <= hole_num < holes_num else 0
+    if not stones:
+        return pits, 0, WrongMove
+    pits = list(pits)
+    pits[own + hole_num] = 0
+    kalah_add = 0
+    # positions of the sowing cycle: own holes, own kalah, opponent's holes
+    cycle = 2*holes_num + 1
+    position = hole_num
+    while stones:
+        position = (position + 1) % cycle
+        stones -= 1
+        if position < holes_num:
+            pits[own + position] += 1
+        elif position == holes_num:
+            kalah_add += 1
+        else:
+            pits[other + position - holes_num - 1] += 1
+    
+    if position == holes_num:
+        if any(pits[own:own + holes_num]):
+            return tuple(pits), kalah_add, MoveEndsInPlayersKalah
+    elif position < holes_num and pits[own + position] == 1:
+        opposite = other + holes_num - position - 1
+        if pits[opposite] > 0:
+            kalah_add += pits[opposite] + 1
+            pits[opposite] = 0
+            pits[own + position] = 0
+    return tuple(pits), kalah_add, MoveEnds
+
 
 class KalahStateList(object):
     """Class that stores a list of the Kalah states
@@ -61,6 +148,18 @@ class KalahStateList(object):
         return self._list
 
 
+class KalahStateNullList(KalahStateList):
+    """List of the Kalah states that doesn't store anything
+    
+    It is used when the intermediate states are not needed (e.g. by
+    searching methods) to avoid copying of the state on each sown stone
+    """
+
+    def add_state(self, state, active_player, active_hole=-1, active_kalah=False):
+        """Skips a state"""
+        pass
+
+
 class KalahState(object):
     """
     Kalah game state
@@ -69,6 +168,8 @@ class KalahState(object):
         _holes_num: amount of holes or pits (default: 6)
         _holes: two lists of contents of each player's holes
         _kalahs: amount of stones in each player's kalah
+        _features: two lists of the evaluation features of each player's
+            side or None if they're not calculated yet (refer to features)
         last_moves: an object of KalahStateList that stores a sequence of
             interimediate states for the moves' animation
         last_move_result: last made move (refer to constants' lists on the top 
@@ -77,6 +178,7 @@ class KalahState(object):
     _holes_num = 6
     _holes = [[], []]
     _kalahs = [0, 0]
+    _features = None
     last_moves = None
     last_move_result = MoveEnds
     
@@ -90,6 +192,7 @@ class KalahState(object):
         self._holes_num = holes_num
         self._holes = [[], []]
         self._kalahs = [0, 0]
+        self._features = None
         for hole in range(self._holes_num):
             self._holes[0].append(stones_per_hole)
             self._holes[1].append(stones_per_hole)
@@ -109,8 +212,53 @@ class KalahState(object):
     def player_points(self, player):
         """Returns amount of stones in player's kalah"""
         return self._kalahs[player]
+    
+    def features(self, player):
+        """Returns a list of the evaluation features of the player's side
+        
+        The features are calculated on the first call and then they're
+        updated by move with the changes of each hole, so a search method
+        gets them without scanning the board. Refer to the list of Feature*
+        constants on the top of the file for the indexes.
+        
+        Do not change the returned list.
+        """
+        if self._features is None:
+            self._features = [[0, self._holes_num, 0, 0], [0, self._holes_num, 0, 0]]
+            holes = self._holes
+            self._holes = [[0]*self._holes_num, [0]*self._holes_num]
+            for player_num in [0, 1]:
+                for hole in range(self._holes_num):
+                    self._set_hole(player_num, hole, holes[player_num][hole])
+        return self._features[player]
+    
+    def _set_hole(self, player, hole, stones):
+        """Sets amount of stones in the player's hole and updates the 
+        evaluation features if they're calculated"""
+        old_stones = self._holes[player][hole]
+        self._holes[player][hole] = stones
+        features = self._features
+        if features is None or old_stones == stones:
+            return
+        other_player = (player+1) % 2
+        opposite_stones = self._holes[other_player][self._holes_num - hole - 1]
+        own, other = features[player], features[other_player]
+        
+        own[FeatureStones] += stones - old_stones
+        if not old_stones:
+            own[FeatureEmptyHoles] -= 1
+            own[FeatureCapturable] -= opposite_stones
+        elif not stones:
+            own[FeatureEmptyHoles] += 1
+            own[FeatureCapturable] += opposite_stones
+        to_kalah = self._holes_num - hole
+        cycle = 2*self._holes_num + 1
+        own[FeatureKalahHoles] += (stones > 0 and stones % cycle == to_kalah) - \
+            (old_stones > 0 and old_stones % cycle == to_kalah)
+        if not opposite_stones:
+            other[FeatureCapturable] += stones - old_stones
             
-    def move(self, player, hole_num):
+    def move(self, player, hole_num, record=True):
         """
         Makes a move
         
@@ -130,9 +278,11 @@ class KalahState(object):
         Args:
             player: current player number (0 or 1)
             hole_num: number of hole or pit from which the move begins
+            record: if False then the intermediate states are not stored
+                (last_moves will be empty)
         """
         self.last_moves = None
-        last_moves = KalahStateList()
+        last_moves = KalahStateList() if record else KalahStateNullList()
         
         def opposite_hole(hole_num):
             return self._holes_num - hole_num - 1
@@ -140,7 +290,7 @@ class KalahState(object):
         def make_turn(player, hole_num=-1, skip_kalah=False):
             # place stones to player's holes
             for hole in range(hole_num+1, self._holes_num):
-                self._holes[player][hole] += 1
+                self._set_hole(player, hole, self._holes[player][hole] + 1)
                 last_moves.add_state(self, player, hole)
                 self.amount_of_stones -= 1
                 if not self.amount_of_stones:
@@ -165,7 +315,7 @@ class KalahState(object):
             return WrongMove
         
         other_player = (player+1) % 2
-        self._holes[player][hole_num] = 0
+        self._set_hole(player, hole_num, 0)
         last_moves.add_state(self, player, hole_num)
         while self.amount_of_stones:
             turn_result, last_hole = make_turn(player, hole_num)
@@ -178,11 +328,11 @@ class KalahState(object):
                 return self.last_move_result
             elif turn_result == MoveEndsInPlayersEmptyHole:
                 if self._holes[other_player][opposite_hole(last_hole)] > 0:
-                    self._holes[player][last_hole] = 0
+                    self._set_hole(player, last_hole, 0)
                     self._kalahs[player] += 1
                     last_moves.add_state(self, player, last_hole, active_kalah=True)
                     kalah_add = self._holes[other_player][opposite_hole(last_hole)]
-                    self._holes[other_player][opposite_hole(last_hole)] = 0
+                    self._set_hole(other_player, opposite_hole(last_hole), 0)
                     last_moves.add_state(self, other_player, opposite_hole(last_hole))
                     self._kalahs[player] += kalah_add
                     last_moves.add_state(self, player, active_kalah=True)
@@ -201,6 +351,22 @@ class KalahState(object):
         self.last_move_result = MoveEnds
         return self.last_move_result
         
+    def get_pits(self):
+        """Returns contents of the both players' holes as one tuple
+        
+        Player 0 holes go first, then player 1 holes. Kalahs are not 
+        included. Refer to sow function for the details
+        """
+        return tuple(self._holes[0] + self._holes[1])
+        
+    def canonical_pits(self, player):
+        """Returns contents of the holes as seen by the player who moves
+        
+        The player's holes go first, then the opponent's holes. Refer to 
+        canonical_pits function for the details
+        """
+        return tuple(self._holes[player] + self._holes[1 - player])
+        
     def get_last_moves(self):
         """Returns a list of last move consequent steps"""
         return self.last_moves
@@ -222,6 +388,15 @@ class KalahState(object):
                 return False
         return True
         
+    def is_decided(self):
+        """
+        Checks if the winner is already known: a player has more than half 
+        of all stones in his/her kalah, so the other one can't catch up 
+        whatever happens next
+        """
+        stones = sum(self._kalahs) + sum(sum(holes) for holes in self._holes)
+        return 2*max(self._kalahs) > stones
+        
     def end_game(self):
         """Ends the game and moves all onboard stones to corresponding 
         player kalah
@@ -232,7 +407,7 @@ class KalahState(object):
         for player in [0,1]:
             for hole in range(self._holes_num):
                 self._kalahs[player] += self._holes[player][hole]
-                self._holes[player][hole] = 0
+                self._set_hole(player, hole, 0)
         return self._kalahs
         
     def to_string(self):
@@ -245,9 +420,13 @@ class KalahState(object):
         
     def copy(self):
         """Returns a copy of the state"""
-        last_moves, self.last_moves = self.last_moves, None
-        state = deepcopy(self)
-        self.last_moves = last_moves
+        state = self.__class__.__new__(self.__class__)
+        state.__dict__.update(self.__dict__)
+        state._holes = [self._holes[0][:], self._holes[1][:]]
+        state._kalahs = self._kalahs[:]
+        if self._features is not None:
+            state._features = [self._features[0][:], self._features[1][:]]
+        state.last_moves = None
         return state
         
     def is_temporary(self):
@@ -267,7 +446,7 @@ class KalahState(object):
         for hole in range(self._holes_num):
             if self._holes[player][hole]:
                 new_state = self.copy()
-                result = new_state.move(player, hole)
+                result = new_state.move(player, hole, record=False)
                 if result == MoveEndsInPlayersKalah:
                     new_player = player
                 else:
@@ -1,14 +1,19 @@
 #!/usr/bin/env python
 
 import state as st
+from ratings import Ratings, SPRT, game_points
 
 import sys
 import inspect
 import time
 import os
+from random import Random
 from os.path import isfile, join
 from importlib import import_module
 from multiprocessing import Process, Pipe
+from multiprocessing.connection import wait
+from multiprocessing.util import Finalize
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 
 class AsyncRunProcess(Process):
@@ -22,46 +27,220 @@ class AsyncRunProcess(Process):
 
     def run(self):
         result = self.obj.make_move(self.state)
-        self.conn.send(("finish", result))
+        self.conn.send(("finish", result, self.obj.statistics()))
+
+
+def _engine_worker(conn):
+    """Main loop of an engine worker process
+
+    The worker gets a method instance for a game ("new"), the states to move
+    in ("move") and sends the moves back. With pondering the method thinks
+    during the opponent's turn until the next command comes. After the game
+    ("stop") the worker waits for the next one; "quit" ends it.
+    """
+    obj, ponder = None, False
+    while True:
+        command, data = conn.recv()
+        if command == "new":
+            obj, ponder = data
+        elif command == "move":
+            state = data
+            result = obj.make_move(state)
+            conn.send(("finish", result, obj.statistics()))
+
+            if ponder:
+                player = obj.player()
+                if state.move(player, result, record=False) != st.MoveEndsInPlayersKalah:
+                    player = (player + 1) % 2
+                if not state.is_finished(player):
+                    obj.ponder(state, player, conn.poll)
+        elif command == "stop":
+            if obj:
+                obj.game_over()
+            obj = None
+        else:
+            break
+
+
+class EnginePool:
+    """Pool of long-lived engine worker processes
+
+    A worker serves one game at a time and returns to the pool after it, so
+    the process start and the imports are paid once per worker instead of
+    once per move; a worker that was terminated on time out is replaced by
+    a new one on demand. The workers are forked from the harness that has
+    already imported all the method modules (a forkserver would run the
+    caller's __main__ module again in every worker).
+
+    Attributes:
+        idle: list of (connection, process) of the workers without a game
+        workers: list of (connection, process) of all the started workers,
+            so the busy ones are stopped on close as well
+    """
+
+    def __init__(self):
+        self.idle = []
+        self.workers = []
+
+    def acquire(self):
+        """Returns a (connection, process) of an idle or a new worker"""
+        while self.idle:
+            conn, process = self.idle.pop()
+            if process.is_alive():
+                return conn, process
+        conn, child_conn = Pipe()
+        process = Process(target=_engine_worker, args=(child_conn,))
+        process.start()
+        self.workers = [worker for worker in self.workers if worker[1].is_alive()] + [(conn, process)]
+        return conn, process
+
+    def release(self, conn, process):
+        if process.is_alive():
+            self.idle.append((conn, process))
+
+    def close(self, timeout=1):
+        """Stops all the workers; a worker that doesn't quit in timeout seconds
+        (e.g. it's still thinking) is terminated"""
+        for conn, process in self.workers:
+            if process.is_alive():
+                try:
+                    conn.send(("quit", None))
+                except OSError:
+                    pass
+        for conn, process in self.workers:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.idle = []
+        self.workers = []
+
+
+class AsyncEngine:
+    """Class that keeps a method instance in an engine worker for the whole game
+
+    The instance is sent to the worker once; then the worker gets only the
+    states to move in.
+    """
+
+    def __init__(self, obj, pool, ponder=True):
+        self.obj = obj
+        self.pool = pool
+        self.conn, self.process = pool.acquire()
+        self.conn.send(("new", (obj, ponder)))
+
+    def request_move(self, state):
+        self.conn.send(("move", state.copy()))
+
+    def stop(self):
+        if self.process.is_alive():
+            self.conn.send(("stop", None))
+            self.pool.release(self.conn, self.process)
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
 
 
 class AsyncRun:
-    """Class that runs method instance for a problem asynchronously"""
+    """Class that runs method instance for a problem asynchronously
+
+    If an engine is given then the move is requested from its process, else
+    a new process is started for the move. The method's search statistics of
+    the move are kept in the statistics attribute.
+
+    A run is started, then waited for (alone with run or together with other
+    runs with wait_for_runs) and finished when it's ready.
+    """
     stop = False
     allowed_time = None
+    statistics = None
+    deadline = None
 
-    def __init__(self, obj, state, timer_limit=-1, be_silent=False):
+    def __init__(self, obj, state, timer_limit=-1, be_silent=False, engine=None):
         self.obj = obj
         self.state = state
         self.be_silent = be_silent
+        self.engine = engine
         if timer_limit < 0:
             self.allowed_time = float('inf')
         else:
             self.allowed_time = timer_limit
 
-    def run(self):
+    def start(self):
         if not self.be_silent:
             print("<{}> thinks...".format(self.obj.name()))
 
-        parent_conn, child_conn = Pipe()
-        self.process = AsyncRunProcess(self.obj, self.state, child_conn)
-        self.process.start()
-        start_time = time.perf_counter()
-        while time.perf_counter() - start_time < self.allowed_time and not parent_conn.poll():
-            time.sleep(0.1)
-
-        if time.perf_counter() - start_time > self.allowed_time:
-            self.process.terminate()
-            self.process.join()
-            return None, "Time out"
-        elif parent_conn.poll():
-            msg, result = parent_conn.recv()
+        if self.engine:
+            self.conn = self.engine.conn
+            self.process = self.engine.process
+            self.engine.request_move(self.state)
+        else:
+            self.conn, child_conn = Pipe()
+            self.process = AsyncRunProcess(self.obj, self.state, child_conn)
+            self.process.start()
+        self.start_time = time.perf_counter()
+        self.deadline = self.start_time + self.allowed_time
+
+    def wait_objects(self):
+        """Returns the objects to wait for with multiprocessing.connection.wait"""
+        return [self.conn, self.process.sentinel]
+
+    def is_ready(self):
+        """Checks without waiting if the result came, the process died or the time is out"""
+        return self.conn.poll() or not self.process.is_alive() or time.perf_counter() >= self.deadline
+
+    def finish(self):
+        """Takes the result of a ready run
+
+        Returns:
+            A tuple of the move (or None) and a message: "Success", "Time out"
+            or "Crash" (the process died without a move)
+        """
+        if self.conn.poll():
+            msg, result, self.statistics = self.conn.recv()
             if not self.be_silent:
-                print("Calculation finished in {:0.2f} seconds, process PID {}".format(time.perf_counter() - start_time, self.process.pid))
-            self.process.join()
+                print("Calculation finished in {:0.2f} seconds, process PID {}".format(time.perf_counter() - self.start_time, self.process.pid))
+                if self.statistics:
+                    print("Search statistics:", self.statistics.to_string())
+            if not self.engine:
+                self.process.join()
             return result, "Success"
 
-        return None, "Unknown"
+        timed_out = self.process.is_alive()
+        self.process.terminate()
+        self.process.join()
+        return None, "Time out" if timed_out else "Crash"
+
+    def run(self):
+        self.start()
+        wait_for_runs([self])
+        return self.finish()
+
+
+def wait_for_runs(runs, timeout=None):
+    """Blocks until at least one of the started runs is ready
+
+    It waits for the connections and the processes of all runs at once, so a
+    result is taken as soon as it comes and a run is woken up exactly at its
+    deadline.
+
+    Args:
+        runs: list of started AsyncRun objects
+        timeout: maximum waiting time in seconds (None - no limit)
+
+    Returns:
+        A list of the ready runs (empty if the timeout is over first)
+    """
+    end_time = time.perf_counter() + (float('inf') if timeout is None else timeout)
+    while True:
+        ready = [run for run in runs if run.is_ready()]
+        now = time.perf_counter()
+        if ready or now >= end_time:
+            return ready
+        wake_time = min([run.deadline for run in runs] + [end_time])
+        wait([obj for run in runs for obj in run.wait_objects()],
+             None if wake_time == float('inf') else wake_time - now)
 
 
 class KalahTimer:
@@ -90,9 +269,16 @@ class KalahGamer:
     store_results = True
     game_results = []
     be_silent = False
+    ponder = True
+    engines = [None, None]
+    engine_pool = None
+    shared_engine_pool = False
+    node_limit = 0
+    workers = None
 
     def __init__(self, result_file='results.txt', turn_time_limit=30, number_of_stones=5,
-                 store_results=True, method_path="methods", be_silent=False):
+                 store_results=True, method_path="methods", be_silent=False, ponder=True, node_limit=0,
+                 workers=None, engine_pool=None):
         self.total_timer = KalahTimer()
         if method_path == "" or not method_path:
             method_path = "."
@@ -107,6 +293,18 @@ class KalahGamer:
         self.active_player = 0
         self.game_results = []
         self.be_silent = be_silent
+        # Pondering depends on the opponent's thinking time, so it's off when
+        # the moves should be reproducible with a node budget
+        self.ponder = ponder and not node_limit
+        self.engines = [None, None]
+        self.node_limit = node_limit
+        # Worker processes of a parallel method's move (None - the method's
+        # own number, refer to Method.set_workers)
+        self.workers = workers
+        # An EnginePool shared with other gamers is closed by its owner, the
+        # gamer's own pool is closed at the end of run_games
+        self.engine_pool = engine_pool
+        self.shared_engine_pool = engine_pool is not None
 
         if not self.load_player_methods(self.method_path, self.methods):
             print("Error: no methods found in ()".format(self.method_path))
@@ -158,8 +356,22 @@ class KalahGamer:
             result.append(player['short_title'])
         return result
 
-    def play_game(self, player1_title, player2_title, history_file):
+    def new_state(self):
+        """Returns the initial state of a game"""
+        return st.KalahState(self.number_of_stones)
 
+    def play_game(self, player1_title, player2_title, history_file, opening=()):
+        """Starts a game
+
+        Args:
+            player1_title, player2_title: short titles of the players
+            history_file: prefix of the game protocol's file name
+            opening: holes of the moves that are made before the players
+                start (refer to random_opening)
+
+        Returns:
+            True if the game is started
+        """
         player1_id, player2_id = 0, 1
         self.players_title = [player1_title, player2_title]
         self.history_file = history_file
@@ -180,7 +392,11 @@ class KalahGamer:
 
         self.active_player = 0
         self.move_result = st.MoveEnds
-        self.current_state = st.KalahState(self.number_of_stones)
+        self.current_state = self.new_state()
+        self.opening = list(opening)
+        for hole in self.opening:
+            if self.current_state.move(self.active_player, hole, record=False) != st.MoveEndsInPlayersKalah:
+                self.switch_player()
         self.initial_state = self.current_state.copy()
         self.on_game = True
         # self.restart_game_timer()
@@ -190,31 +406,65 @@ class KalahGamer:
         if not self.be_silent:
             print("Initial state:\n", self.current_state.to_string())
 
-        self.ai_moves()
         return True
 
     def ai_moves(self, ai_class=None, player_num=-1):
+        """Makes one move of the active player: requests it and waits for it"""
+        ai_run_object = self.start_ai_move(ai_class, player_num)
+        wait_for_runs([ai_run_object])
+        self.finish_ai_move(ai_run_object)
+
+    def start_ai_move(self, ai_class=None, player_num=-1):
+        """Requests a move of the active player and returns the started AsyncRun"""
         if player_num < 0:
             player_num = self.active_player
         if not ai_class:
             ai_class = self.players[player_num]
-        obj = ai_class(player_num)
-        obj.set_run_time_limit(self.turn_time_limit)
 
-        ai_run_object = AsyncRun(obj, self.current_state, self.turn_time_limit*1.1, be_silent=self.be_silent)
-        result, msg = ai_run_object.run()
+        # The method's instance lives in a worker of the engine pool for the whole game
+        if not self.engines[player_num]:
+            obj = ai_class(player_num)
+            obj.set_run_time_limit(self.turn_time_limit)
+            obj.set_node_limit(self.node_limit)
+            if self.workers is not None:
+                obj.set_workers(self.workers)
+            if not self.engine_pool:
+                self.engine_pool = EnginePool()
+            self.engines[player_num] = AsyncEngine(obj, self.engine_pool, self.ponder)
+        engine = self.engines[player_num]
+        obj = engine.obj
+
+        ai_run_object = AsyncRun(obj, self.current_state, self.turn_time_limit*1.1, be_silent=self.be_silent,
+                                 engine=engine)
+        ai_run_object.start()
+        return ai_run_object
+
+    def finish_ai_move(self, ai_run_object):
+        """Makes the move of a ready AsyncRun (refer to start_ai_move)"""
+        result, msg = ai_run_object.finish()
+        if result is None and ai_run_object.engine:
+            # the engine's process is terminated on time out
+            self.engines[self.active_player] = None
         # print("DEBUG: after ai_run_object. Result: {}. Msg {}".format(result, msg))
         if result != None:
-            self.process_ai_move(result)
-        elif msg == "Timeout":
+            if self.process_ai_move(result, ai_run_object.statistics) == st.WrongMove:
+                self.end_game_on_loss('wrong move', "Wrong move. Player %d wins!")
+        else:
+            # a method that crashed has no move either, so it loses as on time out
             self.end_game_on_time()
 
-    def process_ai_move(self, hole):
+    def process_ai_move(self, hole, statistics=None):
         if not self.be_silent:
             print("Make AI move", self.active_player, hole)
 
         if self.on_game:
-            self.make_move(self.active_player, hole)
+            return self.make_move(self.active_player, hole, statistics)
+
+    def stop_engines(self):
+        for player_num in [0, 1]:
+            if self.engines[player_num]:
+                self.engines[player_num].stop()
+                self.engines[player_num] = None
 
     def end_game(self):
         if self.on_game:
@@ -232,31 +482,45 @@ class KalahGamer:
             msg += " Score %d:%d" % (score[0], score[1])
             self.game_results += [{'message': msg, 'score_text': "%d:%d" % (score[0], score[1]),
                                 'score': (score[0], score[1]), 'winner': self.game_winner,
-                                'reason': 'normal', 'total_time': self.total_timer.elapsed()}]
+                                'reason': 'normal', 'total_time': self.total_timer.elapsed(),
+                                'players': tuple(self.players_title)}]
             self.on_game = False
+            self.stop_engines()
 
             self.save_results()
 
-            self.process_next_game()
-
     def end_game_on_time(self):
+        self.end_game_on_loss('timeout', "Time out. Player %d wins!")
+
+    def end_game_on_loss(self, reason, message):
+        """Ends the game with a loss of the active player
+
+        Args:
+            reason: reason of the loss for the results ('timeout', 'wrong move')
+            message: game over message with %d for the winner's number
+        """
         if self.on_game:
             # self.game_timer.stop()
             self.game_winner = 2 - self.active_player
-            self.game_result_score = "Time out"
-            msg = "Time out. Player %d wins!" % (2 - self.active_player)
+            self.game_result_score = reason.capitalize()
+            msg = message % (2 - self.active_player)
             self.game_results += [{'message': msg, 'score_text': "?:?",
                                 'score': (-1, -1), 'winner': self.game_winner,
-                                'reason': 'timeout', 'total_time': self.total_timer.elapsed()}]
+                                'reason': reason, 'total_time': self.total_timer.elapsed(),
+                                'players': tuple(self.players_title)}]
             self.on_game = False
+            self.stop_engines()
 
             self.save_results()
 
-            self.process_next_game()
+    def make_move(self, player, hole, statistics=None):
+        """Makes a move and ends the game if it's over
 
-    def make_move(self, player, hole):
+        Returns:
+            Result of the move (refer to KalahState.move)
+        """
         if hole < 0 or hole >= self.current_state.holes_num() or player != self.active_player:
-            return
+            return st.WrongMove
 
         self.move_result = self.current_state.move(player, hole)
         if not self.be_silent:
@@ -264,18 +528,17 @@ class KalahGamer:
         if self.move_result == st.WrongMove:
             if not self.be_silent:
                 print("Wrong move!")
-            return
+            return self.move_result
 
         self.history.append(
-            {'player': player, 'hole': hole, 'result': self.move_result, 'state': self.current_state.copy()})
+            {'player': player, 'hole': hole, 'result': self.move_result, 'state': self.current_state.copy(),
+             'statistics': statistics})
 
         if self.move_result != st.MoveEndsInPlayersKalah:
             self.switch_player()
         if self.current_state.is_finished(self.active_player):
             self.end_game()
-        else:
-            self.ai_moves()
-            # self.restart_game_timer()
+        return self.move_result
 
     def save_results(self):
         secs = self.game_results[-1]['total_time']
@@ -283,7 +546,7 @@ class KalahGamer:
         hrs, mins = mins / 60, mins % 60
 
         if self.store_results:
-            with open(self.history_file + '-{}.txt'.format(time.strftime('%d.%m.%Y %H:%M')), 'w') as f:
+            with self.open_history_file() as f:
                 f.write("# Player 1: %s\n" % (self.players_title[0],))
                 f.write("# Player 2: %s\n" % (self.players_title[1],))
                 f.write("# Score: %s\n" % (self.game_results[-1]['score_text'],))
@@ -291,10 +554,14 @@ class KalahGamer:
                 f.write("# Total time: %02d:%02d:%02d\n" % (hrs, mins, secs))
 
                 f.write("# " + self.game_results[-1]['message'] + "\n")
+                if self.opening:
+                    f.write("# Opening: %s\n" % (" ".join(map(str, self.opening)),))
                 f.write("# Game protocol\n")
                 f.write("- - %s\n" % (self.initial_state.to_string()))
                 for record in self.history:
                     f.write("%d %d %s\n" % (record['player'], record['hole'], record['state'].to_string()))
+                    if record.get('statistics'):
+                        f.write("# %s\n" % (record['statistics'].to_string(),))
                 # map(lambda x: f.write("%d %d %s\n" % (x['player'], x['hole'], x['state'].to_string())), self.history)
 
             with open(self.result_file, 'a') as f:
@@ -302,8 +569,8 @@ class KalahGamer:
                     time.strftime('%d.%m.%Y %H:%M'),
                     "%02d:%02d:%02d" % (hrs, mins, secs),
                     self.players_title[0], self.players_title[1], self.game_winner))
-                if self.game_results[-1]['reason'] == 'timeout':
-                    f.write(" Timeout\n")
+                if self.game_results[-1]['reason'] != 'normal':
+                    f.write(" %s\n" % (self.game_result_score,))
                 else:
                     f.write(" %s\n" % (self.game_results[-1]['score_text']))
 
@@ -311,26 +578,226 @@ class KalahGamer:
             print(self.game_results[-1]['message'])
             print("Game finished!")
 
-    def run_games(self, games):
+    def open_history_file(self):
+        """Creates a new protocol file of the game
+
+        Games of the same players that finish in the same minute (e.g. in a
+        parallel tournament) get numbered files instead of overwriting each
+        other.
+        """
+        name = self.history_file + '-{}'.format(time.strftime('%d.%m.%Y %H:%M'))
+        path, number = name + '.txt', 1
+        while True:
+            try:
+                return open(path, 'x')
+            except FileExistsError:
+                number += 1
+                path = '{}-{}.txt'.format(name, number)
+
+    def run_games(self, games, callback=None):
+        """Plays the games one after another
+
+        The games and their moves are driven by a loop, so neither a long game
+        nor a long list of games makes the call stack deeper.
+
+        Args:
+            games: list of dictionaries with player_1, player_2 and
+                history_file keys
+            callback: function that is called with the result of each game as
+                soon as it's over
+        """
         self.games = games
-        self.process_next_game()
+        try:
+            while self.process_next_game():
+                while self.on_game:
+                    self.ai_moves()
+                if callback:
+                    callback(self.game_results[-1])
+        finally:
+            # a game that was broken off still has its engines (the pool
+            # terminates them if they are busy)
+            self.stop_engines()
+            if self.engine_pool and not self.shared_engine_pool:
+                self.engine_pool.close()
+                self.engine_pool = None
         return self.game_results
 
     def process_next_game(self):
-        if self.games:
+        """Starts the next game of the list; returns False if there are no more games"""
+        while self.games:
             game = self.games.pop(0)
-            self.play_game(game['player_1'], game['player_2'], game['history_file'])
+            if self.play_game(game['player_1'], game['player_2'], game['history_file'], game.get('opening', ())):
+                return True
+        return False
+
+
+def run_games_interleaved(games, concurrency=2, callback=None, **options):
+    """Plays several games at once in this process
+
+    Every game has its own KalahGamer; a move is requested in each of them and
+    the game whose move comes first goes on (refer to wait_for_runs), so the
+    harness process doesn't wait for one game while the others are ready.
+
+    Args:
+        games: list of games (refer to KalahGamer.run_games)
+        concurrency: number of games at once
+        callback: function that is called with the result of each game as
+            soon as it's over
+        options: arguments of KalahGamer
+
+    Returns:
+        A list of the games' results in the order they finished
+    """
+    options.setdefault('be_silent', True)
+    games, runs, results = list(games), {}, []
+    engine_pool = EnginePool()
+
+    def start_game():
+        while games:
+            gamer = KalahGamer(engine_pool=engine_pool, **options)
+            gamer.games = [games.pop(0)]
+            if gamer.process_next_game():
+                runs[gamer.start_ai_move()] = gamer
+                return
+
+    try:
+        for game in range(concurrency):
+            start_game()
+        while runs:
+            for ai_run_object in wait_for_runs(list(runs)):
+                gamer = runs.pop(ai_run_object)
+                gamer.finish_ai_move(ai_run_object)
+                if gamer.on_game:
+                    runs[gamer.start_ai_move()] = gamer
+                else:
+                    results += gamer.game_results
+                    if callback:
+                        callback(gamer.game_results[-1])
+                    start_game()
+    finally:
+        engine_pool.close()
+    return results
+
+
+# EnginePool of a worker process of run_games_parallel (refer to _init_game_worker)
+_worker_engine_pool = None
+
+
+def _init_game_worker():
+    """Starts the EnginePool of a worker process of run_games_parallel
+
+    The pool serves all the games of the worker, so the engine processes
+    are started once per worker instead of once per game. It's closed when
+    the worker exits (before its child processes are joined).
+    """
+    global _worker_engine_pool
+    _worker_engine_pool = EnginePool()
+    Finalize(_worker_engine_pool, _worker_engine_pool.close, exitpriority=10)
+
+
+def game_executor(processes=None, **options):
+    """Returns a pool of worker processes for run_games_parallel
+
+    It may be kept for several calls of run_games_parallel (e.g. by
+    run_sprt_match), so the workers and their engines are reused.
+
+    Args:
+        processes: number of games at once (refer to _default_processes)
+        options: arguments of KalahGamer
+    """
+    return ProcessPoolExecutor(processes or _default_processes(options), initializer=_init_game_worker)
+
+
+def _play_game_task(game, options):
+    """Plays one game of a parallel tournament in a worker process"""
+    gamer = KalahGamer(engine_pool=_worker_engine_pool, **options)
+    results = gamer.run_games([game])
+    return results[0] if results else None
+
+
+def _default_processes(options):
+    """Returns number of games at once: the number of CPUs, a half of them
+    with pondering as both methods of a game think then, divided by the
+    worker processes of a method's move (the methods' own numbers are
+    counted as one)"""
+    cpus = os.cpu_count() or 1
+    workers = options.get('workers')
+    if workers is None:
+        workers = 1
+    return max(1, cpus // (2 if options.get('ponder', True) else 1) // (workers or cpus))
+
+
+def run_games_parallel(games, processes=None, callback=None, executor=None, **options):
+    """Plays the games at once on a pool of worker processes
+
+    Each game gets its own KalahGamer in a worker and its moves still run in
+    the worker's engine processes (refer to _init_game_worker), so the pool
+    is a ProcessPoolExecutor (the workers of multiprocessing.Pool are
+    daemons and can't start processes).
+
+    Args:
+        games: list of games (refer to KalahGamer.run_games)
+        processes: number of games at once (refer to _default_processes)
+        callback: function that is called with the result of each game as
+            soon as it's over
+        executor: pool of game_executor to play on (it isn't shut down);
+            default: a new one with the processes
+        options: arguments of KalahGamer
+
+    Returns:
+        A list of the games' results in the order of the games (None for a
+        game that couldn't start)
+    """
+    options.setdefault('be_silent', True)
+    own_executor = executor is None
+    if own_executor:
+        executor = game_executor(processes, **options)
+    results = [None]*len(games)
+    try:
+        futures = {executor.submit(_play_game_task, game, options): index for index, game in enumerate(games)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+            if callback and results[futures[future]]:
+                callback(results[futures[future]])
+    finally:
+        if own_executor:
+            executor.shutdown()
+    return results
+
+
+def print_game_result(result):
+    print("{} vs. {}: {}".format(result['players'][0], result['players'][1], result['message']))
+
+
+def print_standings(results):
+    """Prints points (a win - 1, a draw - 0.5) of every player of the games"""
+    standings = {}
+    for result in results:
+        if not result:
+            continue
+        for index, player in enumerate(result['players']):
+            wins, draws, losses = standings.get(player, (0, 0, 0))
+            if result['winner'] == index + 1:
+                wins += 1
+            elif result['winner'] == 0:
+                draws += 1
+            else:
+                losses += 1
+            standings[player] = (wins, draws, losses)
+    print("{:<20} {:>6} {:>5} {:>5} {:>5}".format("Player", "Points", "Wins", "Draws", "Losses"))
+    for player, (wins, draws, losses) in sorted(standings.items(), key=lambda item: -item[1][0] - item[1][1]/2):
+        print("{:<20} {:>6} {:>5} {:>5} {:>5}".format(player, wins + draws/2, wins, draws, losses))
 
 
 def run_single_game(player_1, player_2, players_path='methods',
                     logs_path='game_logs', rolling_game=False,
-                    turn_time_limit=30, save_results=True, be_silent=False):
+                    turn_time_limit=30, save_results=True, be_silent=False, node_limit=0, workers=None):
     if players_path != "":
         sys.path.append(join(sys.path[0], players_path))
 
     gamer = KalahGamer(result_file=logs_path + os.sep + 'results.txt',
                        turn_time_limit=turn_time_limit, store_results=save_results,
-                       method_path=players_path, be_silent=be_silent)
+                       method_path=players_path, be_silent=be_silent, node_limit=node_limit, workers=workers)
     players = gamer.get_players()
 
     if player_1 not in players:
@@ -347,7 +814,7 @@ def run_single_game(player_1, player_2, players_path='methods',
 
     if rolling_game:
         history_file = logs_path + os.sep + player_2.replace(' ', '') + '_' + player_1.replace(' ', '')
-        games.append({'player1': player_2, 'player2': player_1, 'history_file': history_file})
+        games.append({'player_1': player_2, 'player_2': player_1, 'history_file': history_file})
 
     # print(f"Starting a game: {player_1} vs. {player_2}")
 
@@ -357,11 +824,12 @@ def run_single_game(player_1, player_2, players_path='methods',
 
 def run_tournament_one_to_many(player_one="", evaluation_methods=[],
                                player_path='methods', logs_path='game_logs',
-                               turn_time_limit=30):
+                               turn_time_limit=30, node_limit=0, parallel=False, processes=None, workers=None):
     if player_path != "":
         sys.path.append(join(sys.path[0], player_path))
 
-    gamer = KalahGamer(result_file=logs_path + os.sep + 'results.txt', turn_time_limit=turn_time_limit)
+    gamer = KalahGamer(result_file=logs_path + os.sep + 'results.txt', turn_time_limit=turn_time_limit,
+                       node_limit=node_limit, workers=workers)
     players = gamer.get_players()
 
     if player_one not in players:
@@ -382,7 +850,188 @@ def run_tournament_one_to_many(player_one="", evaluation_methods=[],
 
     print("Starting tournament: {} vs. {}".format(player_one, ", ".join(evaluation_methods)))
 
-    gamer.run_games(games)
+    if not parallel:
+        return gamer.run_games(games)
+    results = run_games_parallel(games, processes, print_game_result,
+                                 result_file=logs_path + os.sep + 'results.txt', turn_time_limit=turn_time_limit,
+                                 method_path=player_path, node_limit=node_limit, workers=workers)
+    print_standings(results)
+    return results
+
+
+def run_round_robin(players=None, player_path='methods', logs_path='game_logs',
+                    turn_time_limit=30, node_limit=0, rounds=1, parallel=True, processes=None,
+                    ratings=None, show_ratings=False, workers=None):
+    """Plays every pair of players with both colors and rates the players
+
+    The ratings are updated as soon as each game is over (refer to
+    ratings.py) and their table is printed at the end.
+
+    Args:
+        players: short titles of the players (default: all found methods)
+        rounds: how many times each pair plays with each color
+        parallel: if True then the games are played at once on a pool of
+            worker processes (refer to run_games_parallel)
+        ratings: Ratings object to update (e.g. of the previous tournaments)
+        show_ratings: if True then the table is printed after every game
+        workers: worker processes of a parallel method's move (None - the
+            method's own number)
+        Please refer to KalahGamer for other details
+
+    Returns:
+        The Ratings object
+    """
+    if player_path != "":
+        sys.path.append(join(sys.path[0], player_path))
+
+    gamer = KalahGamer(result_file=logs_path + os.sep + 'results.txt', turn_time_limit=turn_time_limit,
+                       method_path=player_path, node_limit=node_limit, be_silent=parallel, workers=workers)
+    found = gamer.get_players()
+    if players is None:
+        players = found
+    for player in players:
+        if player not in found:
+            print(f"{player} is not found at {player_path} dir")
+            return
+
+    games = []
+    for game_round in range(rounds):
+        for player_1 in players:
+            for player_2 in players:
+                if player_1 != player_2:
+                    history_file = logs_path + os.sep + player_1.replace(' ', '') + '_' + player_2.replace(' ', '')
+                    games.append({'player_1': player_1, 'player_2': player_2, 'history_file': history_file})
+
+    print("Starting round-robin tournament: {}".format(", ".join(players)))
+
+    if ratings is None:
+        ratings = Ratings(players)
+
+    def add_result(result):
+        print_game_result(result)
+        ratings.add_result(result)
+        if show_ratings:
+            print(ratings.to_string())
+
+    if parallel:
+        run_games_parallel(games, processes, add_result,
+                           result_file=logs_path + os.sep + 'results.txt', turn_time_limit=turn_time_limit,
+                           method_path=player_path, node_limit=node_limit, workers=workers)
+    else:
+        gamer.run_games(games, add_result)
+    print(ratings.to_string())
+    return ratings
+
+
+def random_opening(rng, plies, state):
+    """Returns holes of random moves from the initial state
+
+    Args:
+        rng: random.Random object
+        plies: number of moves (an extra turn is a move as well)
+        state: initial state of the game (refer to KalahGamer.new_state); it
+            isn't changed
+    """
+    state, player, opening = state.copy(), 0, []
+    for ply in range(plies):
+        holes = [hole for hole in range(state.holes_num()) if state.player_holes(player)[hole]]
+        hole = rng.choice(holes)
+        opening.append(hole)
+        if state.move(player, hole, record=False) != st.MoveEndsInPlayersKalah:
+            player = (player + 1) % 2
+        if state.is_finished(player):
+            break
+    return opening
+
+
+def run_sprt_match(player, baseline, elo0=0, elo1=10, alpha=0.05, beta=0.05, max_pairs=1000,
+                   opening_plies=4, seed=0, player_path='methods', logs_path='game_logs',
+                   turn_time_limit=30, node_limit=0, parallel=False, processes=None, workers=None):
+    """Plays pairs of games between a player and a baseline until SPRT decides
+
+    Each pair starts from the same random opening with both colors; the
+    sequential probability ratio test (refer to ratings.SPRT) is updated after
+    every pair and the match stops as soon as one of the hypotheses about the
+    player's Elo advantage (elo0 or elo1) is accepted.
+
+    Args:
+        player: short title of the tested player
+        baseline: short title of the baseline player
+        elo0, elo1, alpha, beta: parameters of the test (refer to ratings.SPRT)
+        max_pairs: the match stops undecided after this number of pairs
+        opening_plies: number of random moves of an opening
+        seed: seed of the openings
+        parallel: if True then several pairs are played at once on a pool of
+            worker processes (refer to run_games_parallel)
+        processes: number of games at once with parallel
+        workers: worker processes of a parallel method's move (None - the
+            method's own number)
+        Please refer to KalahGamer for other details
+
+    Returns:
+        The SPRT object; its status is 'H1', 'H0' or None (undecided)
+    """
+    if player_path != "":
+        sys.path.append(join(sys.path[0], player_path))
+
+    options = {'result_file': logs_path + os.sep + 'results.txt', 'turn_time_limit': turn_time_limit,
+               'method_path': player_path, 'node_limit': node_limit, 'be_silent': True, 'workers': workers}
+    # the engines (and with parallel the worker processes) are kept for the
+    # whole match instead of being started for every pair
+    engine_pool = EnginePool()
+    gamer = KalahGamer(engine_pool=engine_pool, **options)
+    for title in [player, baseline]:
+        if title not in gamer.get_players():
+            print(f"{title} is not found at {player_path} dir")
+            return
+
+    sprt = SPRT(elo0, elo1, alpha, beta)
+    rng = Random(seed)
+    processes = processes or _default_processes(options)
+    batch_pairs = parallel and max(1, processes // 2) or 1
+    executor = parallel and game_executor(processes, **options) or None
+
+    print("Starting SPRT match: {} vs. {}, H0: {} Elo, H1: {} Elo".format(player, baseline, elo0, elo1))
+    scheduled_pairs = 0
+    try:
+        while sprt.status() is None and scheduled_pairs < max_pairs:
+            games = []
+            for pair in range(min(batch_pairs, max_pairs - scheduled_pairs)):
+                scheduled_pairs += 1
+                opening = random_opening(rng, opening_plies, gamer.new_state())
+                for player_1, player_2 in [(player, baseline), (baseline, player)]:
+                    history_file = logs_path + os.sep + player_1.replace(' ', '') + '_' + player_2.replace(' ', '')
+                    games.append({'player_1': player_1, 'player_2': player_2, 'history_file': history_file,
+                                  'opening': opening})
+            if parallel:
+                results = run_games_parallel(games, executor=executor, **options)
+            else:
+                # one pair at a time; a game that didn't start is left out by
+                # run_games, so the pair is incomplete then
+                gamer.game_results = []
+                results = gamer.run_games(list(games))
+                if len(results) != len(games):
+                    results = [None]*len(games)
+            for index in range(0, len(games), 2):
+                first, second = results[index], results[index + 1]
+                if not first or not second:
+                    print("A game of the pair didn't start, the pair is skipped")
+                    continue
+                sprt.add_pair(game_points(first)[0] + game_points(second)[1])
+            print(sprt.to_string())
+    finally:
+        engine_pool.close()
+        if executor:
+            executor.shutdown()
+
+    status = sprt.status()
+    if status == 'H1':
+        print("{} is better than {} (H1 accepted)".format(player, baseline))
+    elif status == 'H0':
+        print("{} is not better than {} (H0 accepted)".format(player, baseline))
+    else:
+        print("The match is not decided after {} pairs".format(sprt.pairs()))
+    return sprt
 
 
 if __name__ == "__main__":
@@ -392,5 +1041,12 @@ if __name__ == "__main__":
     #                            evaluation_methods=['Random'],
     #                            turn_time_limit=10)
 
+    # Test a changed player against a baseline until the result is clear
+    # run_sprt_match("Alpha-beta", "MCTS", turn_time_limit=10)
+
+    # Run all pairs of the found players at once on a pool of worker processes
+    # and print their ratings
+    # run_round_robin(turn_time_limit=10)
+
     # Run a single game between two players
     run_single_game("Random", "Random", rolling_game=False, turn_time_limit=5, save_results=False, players_path="")